@@ -0,0 +1,86 @@
+import time
+from datetime import timedelta
+
+from django import db
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from api.models import Alerte, AlerteArchive
+
+
+class Command(BaseCommand):
+    help = "Déplace les alertes closes (et les alertes administrateur) plus anciennes que la rétention vers la table d'archive, par lots."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ALERT_RETENTION_DAYS,
+            help="Âge minimum (en jours, depuis leur fin) des alertes à archiver"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ALERT_ARCHIVE_BATCH_SIZE,
+            help="Nombre d'alertes déplacées par transaction"
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.1,
+            help="Pause (en secondes) entre deux lots"
+        )
+
+    def handle(self, *args, **options):
+        db.close_old_connections()
+        # Episodes closed within the cooldown may still be reopened by the
+        # evaluator, which only reads the alerte table
+        retention = max(
+            timedelta(days=options['days']),
+            timedelta(minutes=settings.ALERT_COOLDOWN_MINUTES),
+        )
+        cutoff = timezone.now() - retention
+        batch_size = options['batch_size']
+        fields = [f.attname for f in Alerte._meta.concrete_fields]
+
+        total = 0
+        while True:
+            moved = self.archive_batch(cutoff, batch_size, fields)
+            total += moved
+            if moved < batch_size:
+                break
+            time.sleep(options['pause'])
+
+        msg = (
+            "--- CRONJOB ARCHIVE ALERTES ---\n"
+            f"{total} alertes antérieures au {cutoff:%Y-%m-%d} archivées.\n"
+        )
+        self.stdout.write(self.style.SUCCESS(msg))
+
+    @staticmethod
+    def archive_batch(cutoff, batch_size, fields):
+        # Short transactions on a bounded set of rows: only these rows are
+        # locked, and rows locked by the alert evaluator are skipped.
+        # Rows age from when they ended, not from when they started. Admin
+        # alerts are created open and never closed: they go by age only.
+        with transaction.atomic():
+            ids = list(
+                Alerte.objects.annotate(ended_at=Coalesce("closed_at", "updated_at", "created_at"))
+                .filter(ended_at__lt=cutoff)
+                .filter(~Q(status="open") | Q(triggered_by="admin"))
+                .order_by("id")
+                .select_for_update(skip_locked=True)
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return 0
+            rows = Alerte.objects.filter(id__in=ids).values(*fields)
+            AlerteArchive.objects.bulk_create(
+                [AlerteArchive(**row) for row in rows], ignore_conflicts=True
+            )
+            Alerte.objects.filter(id__in=ids).delete()
+        return len(ids)
@@ -0,0 +1,170 @@
+import contextlib
+import csv
+import io
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from api.models_ai.weather.backtest import run_fold, walk_forward_folds
+from api.models_ai.weather.weather_prediction_model import WeatherPredictionModel
+from api.services.climatology import climatology_cache
+from api.services.weather_service import MAX_DAYS_AHEAD, WEATHER_FEATURES, parse_horizons
+
+FOLD_COLUMNS = ['feature', 'days', 'fold', 'train_rows', 'test_rows', 'rmse', 'mae', 'fit_seconds', 'peak_rss_mb']
+
+
+class Command(BaseCommand):
+    help = "Évalue les modèles météo par validation glissante (walk-forward) sur l'historique stocké."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--features',
+            type=str,
+            default=','.join(WEATHER_FEATURES),
+            help='Caractéristiques à évaluer, séparées par des virgules'
+        )
+        parser.add_argument(
+            '--days',
+            type=str,
+            default=f'1-{MAX_DAYS_AHEAD}',
+            help='Horizons à évaluer : "1-7", "1,3,5" ou "2"'
+        )
+        parser.add_argument(
+            '--days-back',
+            type=int,
+            default=3 * 365,
+            help="Jours d'historique utilisés (voir sync_climatology --days-back)"
+        )
+        parser.add_argument(
+            '--initial-days',
+            type=int,
+            default=365,
+            help="Jours avant la première origine (l'entraînement s'arrête à l'origine moins l'horizon)"
+        )
+        parser.add_argument(
+            '--test-days',
+            type=int,
+            default=30,
+            help='Jours évalués par pli'
+        )
+        parser.add_argument(
+            '--step-days',
+            type=int,
+            default=30,
+            help='Décalage entre deux plis (en jours)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Nombre de processus'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=1,
+            help='Threads XGBoost par processus'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help='Fichier CSV recevant les résultats de chaque pli'
+        )
+
+    def handle(self, *args, **options):
+        features = [feature.strip() for feature in options['features'].split(',') if feature.strip()]
+        try:
+            horizons = parse_horizons(options['days'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        data = climatology_cache.get(settings.WEATHER_STATION_ID, days_back=options['days_back'])
+        if data is None or data.empty:
+            raise CommandError("Aucune donnée climatologique, lancer d'abord sync_climatology")
+
+        # Feature matrices are built once per model, folds only slice them
+        datasets = {}
+        for feature in features:
+            for days in horizons:
+                model = WeatherPredictionModel(target_feature=feature, days_to_predict=days)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if model.load_data_from_dataframe(data.copy()) is None:
+                        continue
+                    datasets[(feature, days)] = model.build_dataset()[:2]
+
+        tasks = []
+        for (feature, days), (X, y) in datasets.items():
+            folds = walk_forward_folds(
+                len(X), options['initial_days'], options['test_days'], options['step_days'], days
+            )
+            if not folds:
+                self.stdout.write(self.style.WARNING(f"Historique trop court pour {feature} à {days} jour(s)"))
+            tasks += [(feature, days, i, X, y, *fold) for i, fold in enumerate(folds)]
+        if not tasks:
+            raise CommandError("Aucun pli à évaluer")
+
+        start = time.perf_counter()
+        rows = []
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            futures = {
+                executor.submit(run_fold, X, y, train_end, test_start, test_end, options['threads']): (feature, days, i)
+                for feature, days, i, X, y, train_end, test_start, test_end in tasks
+            }
+            for future in as_completed(futures):
+                feature, days, i = futures[future]
+                rows.append({'feature': feature, 'days': days, 'fold': i, **future.result()})
+        wall_time = time.perf_counter() - start
+
+        rows.sort(key=lambda r: (features.index(r['feature']), r['days'], r['fold']))
+        self.write_report(rows)
+        if options['output']:
+            with open(options['output'], 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=FOLD_COLUMNS)
+                writer.writeheader()
+                writer.writerows(rows)
+
+        # ru_maxrss is in kilobytes on Linux
+        peak_rss = max(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        ) / 1024
+        msg = (
+            "--- BACKTEST MÉTÉO ---\n"
+            f"{len(rows)} plis évalués sur {len(datasets)} modèles en {wall_time:.1f}s "
+            f"({options['workers']} processus x {options['threads']} threads).\n"
+            f"Mémoire maximale : {peak_rss:.0f} Mo.\n"
+        )
+        self.stdout.write(self.style.SUCCESS(msg))
+
+    def write_report(self, rows):
+        """
+        Print every fold, then the mean error of each model
+
+        Args:
+            rows (list): One dict per fold
+        """
+        self.stdout.write(f"{'feature':<8}{'days':>5}{'fold':>5}{'train':>7}{'rmse':>8}{'mae':>8}{'fit':>8}{'rss':>8}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['feature']:<8}{row['days']:>5}{row['fold']:>5}{row['train_rows']:>7}"
+                f"{row['rmse']:>8.2f}{row['mae']:>8.2f}{row['fit_seconds']:>7.2f}s{row['peak_rss_mb']:>6.0f}Mo"
+            )
+
+        self.stdout.write(f"\n{'feature':<8}{'days':>5}{'folds':>6}{'rmse':>8}{'mae':>8}{'fit':>9}")
+        models = {}
+        for row in rows:
+            models.setdefault((row['feature'], row['days']), []).append(row)
+        for (feature, days), folds in models.items():
+            self.stdout.write(
+                f"{feature:<8}{days:>5}{len(folds):>6}"
+                f"{sum(r['rmse'] for r in folds) / len(folds):>8.2f}"
+                f"{sum(r['mae'] for r in folds) / len(folds):>8.2f}"
+                f"{sum(r['fit_seconds'] for r in folds):>8.1f}s"
+            )
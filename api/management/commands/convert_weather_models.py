@@ -0,0 +1,34 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.models_ai.weather.bundle import bundle_path
+from api.models_ai.weather.registry import weather_model_registry
+from api.models_ai.weather.weather_prediction_model import WeatherPredictionModel
+
+
+class Command(BaseCommand):
+    help = "Convertit les modèles météo joblib existants au format bundle (fichier unique, sans pickle)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Supprime les fichiers joblib une fois le bundle écrit'
+        )
+
+    def handle(self, *args, **options):
+        path = settings.WEATHER_MODEL_DIR
+        converted = 0
+        for feature, days in weather_model_registry.available():
+            if os.path.exists(bundle_path(path, feature, days)):
+                continue
+            model = WeatherPredictionModel(target_feature=feature, days_to_predict=days)
+            if not model.load_model(path) or not model.save_model(path):
+                self.stdout.write(self.style.ERROR(f"Échec de la conversion de {feature} à {days} jour(s)"))
+                continue
+            converted += 1
+            if options['delete']:
+                for name in (f"model_{feature}_{days}day.joblib", f"scaler_{feature}_{days}day.joblib", f"features_{feature}_{days}day.txt"):
+                    os.remove(os.path.join(path, name))
+
+        self.stdout.write(self.style.SUCCESS(f"{converted} modèle(s) converti(s) dans {path}."))
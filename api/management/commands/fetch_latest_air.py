@@ -1,8 +1,10 @@
 import os
-import requests
 from django.core.management.base import BaseCommand
 from datetime import datetime, timezone, timedelta
 from api.models import AirQualityMeasurement
+from api.services.upstream_budget import INGESTION
+from api.utils import upstream
+from api.signals import measurements_ingested
 from django import db
 
 API_KEY = os.environ.get("OPENWEATHERMAP_API_KEY")
@@ -22,7 +24,11 @@ class Command(BaseCommand):
             "end": int(end_dt.timestamp()),
             "appid": API_KEY
         }
-        response = requests.get(url, params=params)
+        try:
+            response = upstream.get(upstream.OWM, url, API_KEY, INGESTION, params=params, timeout=30)
+        except upstream.UNAVAILABLE_ERRORS as e:
+            self.stdout.write(self.style.ERROR(f"OpenWeatherMap indisponible : {e}"))
+            return
         data = response.json().get("list", [])
         to_create = []
         for item in data:
@@ -54,4 +60,20 @@ class Command(BaseCommand):
             "--- CRONJOB IMPORT AQ ---\n"
             f"{len(to_create)} mesures importées.)\n"
         )
-        self.stdout.write(self.style.SUCCESS(msg))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(msg))
+
+        if not to_create:
+            return
+        # Alert evaluation runs on the rows we just stored, right after ingest
+        responses = measurements_ingested.send_robust(
+            sender=self.__class__, measurements=to_create
+        )
+        for receiver, result in responses:
+            if isinstance(result, Exception):
+                self.stdout.write(self.style.ERROR(f"Évaluation des alertes échouée : {result}"))
+            elif result is not None:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Alertes ouvertes : {len(result['opened'])}, "
+                    f"mises à jour : {len(result['updated'])}, "
+                    f"closes : {len(result['closed'])}"
+                ))
\ No newline at end of file
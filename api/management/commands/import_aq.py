@@ -1,8 +1,9 @@
 import os
-import requests
 from django.core.management.base import BaseCommand
 from datetime import datetime, timezone, timedelta
 from api.models import AirQualityMeasurement
+from api.services.upstream_budget import INGESTION
+from api.utils import upstream
 
 API_KEY = os.environ.get("OPENWEATHERMAP_API_KEY")
 
@@ -23,7 +24,11 @@ class Command(BaseCommand):
             "end": int(end_dt.timestamp()),
             "appid": API_KEY
         }
-        response = requests.get(url, params=params)
+        try:
+            response = upstream.get(upstream.OWM, url, API_KEY, INGESTION, params=params, timeout=30)
+        except upstream.UNAVAILABLE_ERRORS as e:
+            self.stdout.write(self.style.ERROR(f"OpenWeatherMap indisponible : {e}"))
+            return
         data = response.json().get("list", [])
 
         # Préparer toutes les identités à vérifier (pour éviter les doublons)
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.utils.startup_profile import profile_imports
+
+
+class Command(BaseCommand):
+    help = "Mesure le temps d'import et la mémoire au démarrage d'un worker web (python -X importtime)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            type=str,
+            default='smart_city.urls',
+            help='Module importé après django.setup()'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help='Nombre de modules les plus lents à afficher'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Échoue si STARTUP_IMPORT_BUDGET_SECONDS ou STARTUP_RSS_BUDGET_MB est dépassé'
+        )
+
+    def handle(self, *args, **options):
+        profile = profile_imports(options['target'])
+
+        self.stdout.write(f"{'cumulé (ms)':>12}{'propre (ms)':>12}  module")
+        for module, self_us, cumulative_us in profile['modules'][: options['top']]:
+            self.stdout.write(f"{cumulative_us / 1000:>12.1f}{self_us / 1000:>12.1f}  {module}")
+
+        msg = (
+            "--- PROFIL DE DÉMARRAGE ---\n"
+            f"Import de {options['target']} : {profile['seconds']:.2f}s "
+            f"(budget {settings.STARTUP_IMPORT_BUDGET_SECONDS}s)\n"
+            f"Mémoire maximale : {profile['rss_mb']:.0f} Mo (budget {settings.STARTUP_RSS_BUDGET_MB} Mo)\n"
+            f"Dépendances lourdes chargées : {', '.join(profile['heavy']) or 'aucune'}\n"
+        )
+        self.stdout.write(self.style.SUCCESS(msg))
+
+        if options['check']:
+            if profile['seconds'] > settings.STARTUP_IMPORT_BUDGET_SECONDS:
+                raise CommandError("Budget de temps d'import dépassé")
+            if profile['rss_mb'] > settings.STARTUP_RSS_BUDGET_MB:
+                raise CommandError("Budget mémoire dépassé")
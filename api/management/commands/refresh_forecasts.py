@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.services.forecasts import refresh_forecasts
+
+
+class Command(BaseCommand):
+    help = "Calcule les prévisions météo de chaque (station, caractéristique, horizon) et les stocke en base."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--station',
+            type=str,
+            default=settings.WEATHER_STATION_ID,
+            help='ID(s) de station météo, séparés par des virgules'
+        )
+
+    def handle(self, *args, **options):
+        stations = [station.strip() for station in options['station'].split(',') if station.strip()]
+        result = refresh_forecasts(stations)
+        msg = (
+            "--- CRONJOB PRÉVISIONS MÉTÉO ---\n"
+            f"{result['stored']} prévisions enregistrées, "
+            f"{result['pending']} en attente d'un modèle entraîné, "
+            f"{result['deleted']} prévisions passées supprimées.\n"
+        )
+        self.stdout.write(self.style.SUCCESS(msg))
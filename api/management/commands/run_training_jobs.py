@@ -0,0 +1,37 @@
+from django import db
+from django.core.management.base import BaseCommand
+from api.services.forecasts import refresh_forecasts
+from api.services.training_jobs import claim_next, fail_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = "Exécute les entraînements de modèles météo en attente (worker du scheduler)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=10,
+            help="Nombre maximum d'entraînements exécutés lors de ce passage"
+        )
+
+    def handle(self, *args, **options):
+        db.close_old_connections()
+        stale = fail_stale_jobs()
+        if stale:
+            self.stdout.write(self.style.WARNING(f"{stale} entraînement(s) bloqué(s) marqué(s) en échec."))
+
+        for _ in range(options['max_jobs']):
+            job = claim_next()
+            if job is None:
+                break
+            self.stdout.write(f"Entraînement du modèle {job.feature} à {job.days} jour(s) (job {job.id})...")
+            job = run_job(job)
+            if job.status == "succeeded":
+                self.stdout.write(self.style.SUCCESS(
+                    f"Job {job.id} terminé. Test RMSE: {job.metrics['test_rmse']:.2f}"
+                ))
+                # The new model's forecasts are served without waiting for the daily refresh
+                refresh_forecasts(features=[job.feature], horizons=[job.days])
+            else:
+                self.stdout.write(self.style.ERROR(f"Job {job.id} en échec : {job.error}"))
@@ -4,14 +4,39 @@ from django.core.management import call_command
 import signal
 import sys
 import time
+from datetime import datetime
+
+
+def sync_and_forecast():
+    call_command('sync_climatology')
+    call_command('refresh_forecasts')
+
+
+def update_models_and_forecast():
+    call_command('train_weather_models', incremental=True)
+    call_command('refresh_forecasts')
+
 
 class Command(BaseCommand):
-    help = "Lance un scheduler APScheduler pour exécuter check_alerts toutes les heures."
+    help = "Lance un scheduler APScheduler pour exécuter fetch_latest_air (et l'évaluation des alertes) toutes les 30 minutes."
 
     def handle(self, *args, **options):
         scheduler = BackgroundScheduler()
-        scheduler.add_job(lambda: call_command('check_alerts'), 'interval', minutes=30)
         scheduler.add_job(lambda: call_command('fetch_latest_air'), 'interval', minutes=30)
+        scheduler.add_job(lambda: call_command('archive_alerts'), 'cron', hour=3, minute=0)
+        scheduler.add_job(
+            lambda: call_command('run_training_jobs'), 'interval', minutes=1,
+            max_instances=1, coalesce=True
+        )
+        scheduler.add_job(
+            sync_and_forecast, 'cron', hour=6, minute=0,
+            next_run_time=datetime.now()
+        )
+        # Daily refresh of the weather models on the newly synced days
+        scheduler.add_job(
+            update_models_and_forecast, 'cron', hour=6, minute=30,
+            max_instances=1, coalesce=True
+        )
         scheduler.start()
         self.stdout.write(self.style.SUCCESS('APScheduler démarré.'))
 
@@ -0,0 +1,38 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.services.climatology import climatology_cache
+
+
+class Command(BaseCommand):
+    help = "Commande les jours manquants de données climatologiques Météo France et les stocke en base."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--station',
+            type=str,
+            default=settings.WEATHER_STATION_ID,
+            help='ID(s) de station météo, séparés par des virgules'
+        )
+        parser.add_argument(
+            '--days-back',
+            type=int,
+            default=settings.CLIMATOLOGY_DAYS_BACK,
+            help="Nombre de jours d'historique à commander"
+        )
+
+    def handle(self, *args, **options):
+        api_key = os.environ.get('METEOFRANCE_API_KEY')
+        if not api_key:
+            self.stdout.write(
+                self.style.ERROR('METEOFRANCE_API_KEY environment variable not set')
+            )
+            return
+
+        stations = [station.strip() for station in options['station'].split(',') if station.strip()]
+        stored = climatology_cache.sync_many(stations, options['days_back'], api_key)
+        msg = "--- CRONJOB CLIMATOLOGIE ---\n" + "".join(
+            f"{count} observations journalières enregistrées pour {station}.\n"
+            for station, count in stored.items()
+        )
+        self.stdout.write(self.style.SUCCESS(msg))
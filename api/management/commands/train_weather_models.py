@@ -1,6 +1,17 @@
+import csv
 import os
-from django.core.management.base import BaseCommand
-from api.services.weather_service import WeatherPredictionService
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from api.models_ai.weather.registry import weather_model_registry
+from api.models_ai.weather.weather_prediction_model import train_model
+from api.services.climatology import climatology_cache
+from api.services.weather_service import MAX_DAYS_AHEAD, parse_horizons
+
+SUMMARY_COLUMNS = ['feature', 'days', 'status', 'mode', 'test_rmse', 'test_mae', 'test_r2', 'training_time', 'error']
 
 
 class Command(BaseCommand):
@@ -15,21 +26,46 @@ class Command(BaseCommand):
         )
         parser.add_argument(
             '--days',
-            type=int,
-            default=1,
-            help='Number of days ahead to predict'
+            type=str,
+            default=f'1-{MAX_DAYS_AHEAD}',
+            help='Days ahead to predict: "1-7", "1,3,5" or "2"'
         )
         parser.add_argument(
             '--force',
             action='store_true',
             help='Force retrain even if model already exists'
         )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Update existing models with the new days (full retrain on drift or for missing models)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of training processes (default: one per core, at most one per model)'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=None,
+            help='XGBoost threads per training process (default: cores / workers)'
+        )
+        parser.add_argument(
+            '--summary',
+            type=str,
+            default=os.path.join(settings.WEATHER_MODEL_DIR, 'training_summary.csv'),
+            help='CSV file receiving the metrics summary'
+        )
 
     def handle(self, *args, **options):
-        features = options['features'].split(',')
-        days = options['days']
-        force = options['force']
-        
+        features = [feature.strip() for feature in options['features'].split(',') if feature.strip()]
+        try:
+            horizons = parse_horizons(options['days'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
         # Get API key from environment
         api_key = os.environ.get('METEOFRANCE_API_KEY')
         if not api_key:
@@ -37,59 +73,105 @@ class Command(BaseCommand):
                 self.style.ERROR('METEOFRANCE_API_KEY environment variable not set')
             )
             return
-        
-        # Create weather service
-        weather_service = WeatherPredictionService(api_key)
-        
+
+        jobs = [
+            (feature, days)
+            for feature in features
+            for days in horizons
+            if options['force'] or options['incremental'] or weather_model_registry.version(feature, days) is None
+        ]
+        if not jobs:
+            self.stdout.write(self.style.SUCCESS('All models already exist, use --force to retrain'))
+            return
+
+        # Order missing days only, then read 1 year of training data, once for every model
+        station_id = settings.WEATHER_STATION_ID
+        climatology_cache.sync(station_id, 365, api_key)
+        data = climatology_cache.get(station_id, days_back=365)
+        if data is None or data.empty:
+            self.stdout.write(self.style.ERROR('No data available for training'))
+            return
+
+        # Split the cores between processes so XGBoost does not oversubscribe them
+        cores = os.cpu_count() or 1
+        workers = max(1, min(options['workers'] or cores, len(jobs)))
+        threads = options['threads'] or max(1, cores // workers)
+
         self.stdout.write(
-            self.style.SUCCESS(f'Starting model training for features: {features}')
+            self.style.SUCCESS(
+                f'Starting training of {len(jobs)} models for features {features}, '
+                f'days {horizons} ({workers} processes x {threads} threads)'
+            )
         )
-        
-        for feature in features:
-            feature = feature.strip()
-            self.stdout.write(f'Training model for {feature}...')
-            
-            try:
-                # Get recent data for training
-                recent_data = weather_service.meteo_api.get_recent_data(
-                    weather_service.station_id, 
-                    days_back=365  # Use 1 year of data for training
-                )
-                
-                if recent_data is None or recent_data.empty:
+
+        start = time.time()
+        rows = []
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    train_model, data, feature, days, settings.WEATHER_MODEL_DIR, threads,
+                    incremental=options['incremental'],
+                    new_trees=settings.WEATHER_INCREMENTAL_TREES,
+                    drift_ratio=settings.WEATHER_DRIFT_RATIO,
+                    max_trees=settings.WEATHER_MAX_TREES,
+                ): (feature, days)
+                for feature, days in jobs
+            }
+            for future in as_completed(futures):
+                feature, days = futures[future]
+                row = {'feature': feature, 'days': days}
+                try:
+                    row.update(future.result())
+                    row['status'] = 'ok'
+                    if row['mode'] == 'unchanged':
+                        self.stdout.write(f'Model for {feature} +{days}d is up to date')
+                    else:
+                        self.stdout.write(
+                            self.style.SUCCESS(
+                                f'Model for {feature} +{days}d trained successfully ({row["mode"]}). '
+                                f'Test RMSE: {row["test_rmse"]:.2f}, '
+                                f'Test R²: {row["test_r2"]:.4f}'
+                            )
+                        )
+                except Exception as e:
+                    row.update({'status': 'failed', 'error': str(e)})
                     self.stdout.write(
-                        self.style.WARNING(f'No data available for {feature}')
+                        self.style.ERROR(f'Failed to train model for {feature} +{days}d: {str(e)}')
                     )
-                    continue
-                
-                # Create and train model
-                from api.models_ai.weather.weather_prediction_model import WeatherPredictionModel
-                model = WeatherPredictionModel(
-                    target_feature=feature,
-                    days_to_predict=days
-                )
-                
-                # Load data and train
-                model.load_data_from_dataframe(recent_data)
-                trained_model, metrics = model.build_model()
-                
-                # Save model
-                model_path = f"api/models_ai/weather/saved_models"
-                model.save_model(model_path)
-                
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Model for {feature} trained successfully. '
-                        f'Test RMSE: {metrics["test_rmse"]:.2f}, '
-                        f'Test R²: {metrics["test_r2"]:.4f}'
-                    )
-                )
-                
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'Failed to train model for {feature}: {str(e)}')
-                )
-        
+                rows.append(row)
+
+        rows.sort(key=lambda r: (features.index(r['feature']), r['days']))
+        weather_model_registry.invalidate()
+        self.write_summary(rows, options['summary'])
+
         self.stdout.write(
-            self.style.SUCCESS('Model training completed!')
+            self.style.SUCCESS(f'Model training completed in {time.time() - start:.1f}s!')
         )
+
+    def write_summary(self, rows, path):
+        """
+        Print the metrics of every model and save them as CSV
+
+        Args:
+            rows (list): One dict of metrics per model
+            path (str): CSV file
+        """
+        self.stdout.write(f'{"feature":<8}{"days":>5}{"status":>8}{"mode":>13}{"rmse":>8}{"mae":>8}{"r2":>8}{"time":>8}')
+        for row in rows:
+            if row['status'] == 'ok' and row['mode'] != 'unchanged':
+                self.stdout.write(
+                    f'{row["feature"]:<8}{row["days"]:>5}{row["status"]:>8}{row["mode"]:>13}'
+                    f'{row["test_rmse"]:>8.2f}{row["test_mae"]:>8.2f}'
+                    f'{row["test_r2"]:>8.4f}{row["training_time"]:>7.1f}s'
+                )
+            else:
+                self.stdout.write(f'{row["feature"]:<8}{row["days"]:>5}{row["status"]:>8}{row.get("mode", ""):>13}')
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        self.stdout.write(f'Summary written to {path}')
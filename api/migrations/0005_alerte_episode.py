@@ -0,0 +1,52 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_airqualitymeasurement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alerte',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alerte',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        # Existing alerts predate episode tracking: store them as closed.
+        migrations.AddField(
+            model_name='alerte',
+            name='status',
+            field=models.CharField(choices=[('open', 'Ouverte'), ('closed', 'Close')], default='closed', max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='alerte',
+            name='status',
+            field=models.CharField(choices=[('open', 'Ouverte'), ('closed', 'Close')], default='open', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='alerte',
+            name='peak_value',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alerte',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='alerte',
+            name='updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alerte',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
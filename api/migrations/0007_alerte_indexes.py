@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_cacheversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alerte',
+            index=models.Index(fields=['created_at', 'id'], name='alerte_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alerte',
+            index=models.Index(fields=['alert_type', 'created_at'], name='alerte_type_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alerte',
+            index=models.Index(fields=['triggered_by', 'created_at'], name='alerte_trigger_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alerte',
+            index=models.Index(fields=['threshold', 'created_at'], name='alerte_thr_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alerte',
+            index=models.Index(fields=['status', 'created_at'], name='alerte_status_created_idx'),
+        ),
+    ]
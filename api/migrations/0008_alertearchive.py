@@ -0,0 +1,36 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_alerte_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlerteArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('triggered_by', models.CharField(choices=[('auto', 'Automatique'), ('admin', 'Administrateur')], max_length=16)),
+                ('value', models.FloatField(blank=True, null=True)),
+                ('message', models.TextField()),
+                ('alert_type', models.CharField(choices=[('info', 'Information'), ('warning', 'Avertissement'), ('critical', 'Critique')], default='info', max_length=16)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('open', 'Ouverte'), ('closed', 'Close')], default='closed', max_length=16)),
+                ('peak_value', models.FloatField(blank=True, null=True)),
+                ('occurrences', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('threshold', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.alertthreshold')),
+            ],
+            options={
+                'db_table': 'alerte_archive',
+                'indexes': [models.Index(fields=['created_at', 'id'], name='alerte_arch_created_idx')],
+            },
+        ),
+    ]
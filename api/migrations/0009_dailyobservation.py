@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_alertearchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('station_id', models.CharField(max_length=16)),
+                ('date', models.DateField()),
+                ('rr', models.FloatField(blank=True, null=True)),
+                ('tn', models.FloatField(blank=True, null=True)),
+                ('tx', models.FloatField(blank=True, null=True)),
+                ('tm', models.FloatField(blank=True, null=True)),
+                ('tampli', models.FloatField(blank=True, null=True)),
+                ('ffm', models.FloatField(blank=True, null=True)),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'daily_observation',
+                'unique_together': {('station_id', 'date')},
+            },
+        ),
+    ]
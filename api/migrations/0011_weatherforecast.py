@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_trainingjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeatherForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('station_id', models.CharField(max_length=16)),
+                ('feature', models.CharField(max_length=16)),
+                ('days', models.PositiveSmallIntegerField()),
+                ('base_date', models.DateField()),
+                ('target_date', models.DateField()),
+                ('value', models.FloatField()),
+                ('latest_data', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'weather_forecast',
+                'unique_together': {('station_id', 'feature', 'days')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_weatherforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpstreamBudget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('api', models.CharField(max_length=16)),
+                ('key_id', models.CharField(max_length=16)),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.DateTimeField()),
+                ('granted', models.BigIntegerField(default=0)),
+                ('throttled', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'upstream_budget',
+                'unique_together': {('api', 'key_id')},
+            },
+        ),
+    ]
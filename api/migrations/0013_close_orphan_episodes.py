@@ -0,0 +1,22 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def close_orphan_episodes(apps, schema_editor):
+    # Episodes left open on thresholds deactivated before they were closed
+    Alerte = apps.get_model('api', 'Alerte')
+    now = timezone.now()
+    Alerte.objects.filter(
+        triggered_by='auto', status='open', threshold__active=False
+    ).update(status='closed', closed_at=now, updated_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_upstreambudget'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_orphan_episodes, migrations.RunPython.noop)
+    ]
@@ -0,0 +1,19 @@
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_close_orphan_episodes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alerte',
+            index=models.Index(
+                django.db.models.functions.comparison.Coalesce('closed_at', 'updated_at', 'created_at'),
+                name='alerte_ended_idx',
+            ),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 
 ALERT_TYPE_CHOICES = [
     ("info", "Information"),
@@ -6,6 +7,18 @@ ALERT_TYPE_CHOICES = [
     ("critical", "Critique"),
 ]
 
+TRAINING_JOB_STATUS_CHOICES = [
+    ("queued", "En attente"),
+    ("running", "En cours"),
+    ("succeeded", "Terminé"),
+    ("failed", "Échoué"),
+]
+
+ALERT_STATUS_CHOICES = [
+    ("open", "Ouverte"),
+    ("closed", "Close"),
+]
+
 
 # Create your models here.
 class RefIndicator(models.Model):
@@ -44,9 +57,69 @@ class Alerte(models.Model):
     alert_type = models.CharField(
         max_length=16, choices=ALERT_TYPE_CHOICES, default="info"
     )
+    # Episode tracking for automatic alerts: one row per incident, updated
+    # in place while the value stays above the hysteresis band.
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    status = models.CharField(
+        max_length=16, choices=ALERT_STATUS_CHOICES, default="open"
+    )
+    peak_value = models.FloatField(null=True, blank=True)
+    occurrences = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = "alerte"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="alerte_created_idx"),
+            models.Index(fields=["alert_type", "created_at"], name="alerte_type_created_idx"),
+            models.Index(fields=["triggered_by", "created_at"], name="alerte_trigger_created_idx"),
+            models.Index(fields=["threshold", "created_at"], name="alerte_thr_created_idx"),
+            models.Index(fields=["status", "created_at"], name="alerte_status_created_idx"),
+            # End of an alert, used by archive_alerts
+            models.Index(Coalesce("closed_at", "updated_at", "created_at"), name="alerte_ended_idx"),
+        ]
+
+class AlerteArchive(models.Model):
+    """Cold copy of old, closed alerts moved out of ``alerte`` by archive_alerts."""
+    id = models.BigIntegerField(primary_key=True)
+    created_at = models.DateTimeField()
+    triggered_by = models.CharField(
+        max_length=16, choices=[("auto", "Automatique"), ("admin", "Administrateur")]
+    )
+    threshold = models.ForeignKey(
+        "AlertThreshold", on_delete=models.PROTECT, null=True, blank=True, related_name="+"
+    )
+    value = models.FloatField(null=True, blank=True)
+    message = models.TextField()
+    alert_type = models.CharField(
+        max_length=16, choices=ALERT_TYPE_CHOICES, default="info"
+    )
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    status = models.CharField(
+        max_length=16, choices=ALERT_STATUS_CHOICES, default="closed"
+    )
+    peak_value = models.FloatField(null=True, blank=True)
+    occurrences = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "alerte_archive"
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="alerte_arch_created_idx"),
+        ]
+
+class CacheVersion(models.Model):
+    """Cross-process version counter used to invalidate in-memory caches."""
+    key = models.CharField(max_length=64, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "cache_version"
 
 class AirQualityMeasurement(models.Model):
     latitude = models.FloatField()
@@ -67,4 +140,75 @@ class AirQualityMeasurement(models.Model):
         indexes = [
             models.Index(fields=["latitude", "longitude", "datetime_utc"]),
         ]
-        unique_together = ("latitude", "longitude", "datetime_utc")
\ No newline at end of file
+        unique_together = ("latitude", "longitude", "datetime_utc")
+
+class DailyObservation(models.Model):
+    """Daily Météo France climatology of a station, synced by sync_climatology."""
+    station_id = models.CharField(max_length=16)
+    date = models.DateField()
+    rr = models.FloatField(null=True, blank=True)  # Précipitations (mm)
+    tn = models.FloatField(null=True, blank=True)  # Température minimale (°C)
+    tx = models.FloatField(null=True, blank=True)  # Température maximale (°C)
+    tm = models.FloatField(null=True, blank=True)  # Température moyenne (°C)
+    tampli = models.FloatField(null=True, blank=True)  # Amplitude thermique (°C)
+    ffm = models.FloatField(null=True, blank=True)  # Vent moyen (m/s)
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "daily_observation"
+        unique_together = ("station_id", "date")
+
+class WeatherForecast(models.Model):
+    """Latest forecast of a (station, feature, horizon), refreshed daily by refresh_forecasts."""
+    station_id = models.CharField(max_length=16)
+    feature = models.CharField(max_length=16)
+    days = models.PositiveSmallIntegerField()
+    base_date = models.DateField()  # Dernier jour observé utilisé par le modèle
+    target_date = models.DateField()
+    value = models.FloatField()
+    latest_data = models.JSONField(default=dict)  # Dernière observation, renvoyée en contexte
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "weather_forecast"
+        unique_together = ("station_id", "feature", "days")
+
+class UpstreamBudget(models.Model):
+    """Token bucket of an upstream API key, shared by the web and scheduler processes."""
+    api = models.CharField(max_length=16)
+    key_id = models.CharField(max_length=16)  # Empreinte de la clé d'API, jamais la clé elle-même
+    tokens = models.FloatField()
+    updated_at = models.DateTimeField()
+    granted = models.BigIntegerField(default=0)
+    throttled = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "upstream_budget"
+        unique_together = ("api", "key_id")
+
+class TrainingJob(models.Model):
+    """Weather model training request, processed by run_training_jobs."""
+    feature = models.CharField(max_length=16)
+    days = models.PositiveSmallIntegerField()
+    status = models.CharField(
+        max_length=16, choices=TRAINING_JOB_STATUS_CHOICES, default="queued"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    metrics = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        db_table = "training_job"
+        constraints = [
+            # Single-flight: at most one pending job per model
+            models.UniqueConstraint(
+                fields=["feature", "days"],
+                condition=models.Q(status__in=["queued", "running"]),
+                name="training_job_single_flight",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="training_job_status_idx"),
+        ]
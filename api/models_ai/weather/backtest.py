@@ -0,0 +1,78 @@
+"""
+Walk-forward (rolling-origin) evaluation of weather models
+
+Each fold trains on the days before its origin (expanding window) and
+is evaluated on the following test_days days. The origin then moves
+forward by step_days. Row i is labelled with day i + horizon, so the last
+horizon rows before the origin are left out of training: their labels
+fall inside the test window and are not known yet at the origin. Functions only depend on their arguments, so folds
+can run in worker processes.
+"""
+import resource
+import time
+
+import numpy as np
+
+
+def walk_forward_folds(n_rows, initial_days, test_days, step_days, horizon):
+    """
+    Boundaries of the walk-forward folds
+
+    Args:
+        n_rows (int): Number of rows of the dataset
+        initial_days (int): Rows before the first fold origin
+        test_days (int): Rows evaluated by each fold
+        step_days (int): Rows between two fold origins
+        horizon (int): Days between a row and its label
+
+    Returns:
+        list: (train_end, test_start, test_end) row indexes, train is
+            [0, train_end) and test is [test_start, test_end), with
+            train_end = test_start - horizon
+    """
+    folds = []
+    origin = max(initial_days, horizon + 1)
+    while origin + test_days <= n_rows:
+        folds.append((origin - horizon, origin, origin + test_days))
+        origin += step_days
+    return folds
+
+
+def run_fold(X, y, train_end, test_start, test_end, n_jobs=1):
+    """
+    Train on the rows labelled before a fold origin and evaluate on the next rows
+
+    Args:
+        X (np.ndarray): Feature matrix, chronological
+        y (np.ndarray): Target
+        train_end (int): Row after the last training row
+        test_start (int): First test row (fold origin)
+        test_end (int): Row after the last test row
+        n_jobs (int): XGBoost threads
+
+    Returns:
+        dict: rmse, mae, train_rows, test_rows, fit_seconds and peak_rss_mb
+            of the worker process
+    """
+    import xgboost as xgb
+    from sklearn.preprocessing import StandardScaler
+
+    from api.models_ai.weather.weather_prediction_model import XGB_PARAMS
+
+    start = time.perf_counter()
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X[:train_end])
+    X_test = scaler.transform(X[test_start:test_end])
+    model = xgb.XGBRegressor(**XGB_PARAMS, n_jobs=n_jobs)
+    model.fit(X_train, y[:train_end], verbose=False)
+    errors = model.predict(X_test) - y[test_start:test_end]
+
+    return {
+        "rmse": float(np.sqrt(np.mean(errors ** 2))),
+        "mae": float(np.mean(np.abs(errors))),
+        "train_rows": int(train_end),
+        "test_rows": int(test_end - test_start),
+        "fit_seconds": time.perf_counter() - start,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
@@ -0,0 +1,144 @@
+"""
+Single-file weather model bundle
+
+Layout:
+    MAGIC (8 bytes) | header length (uint32, little endian) | JSON header | booster
+
+The header holds the format version, the feature names, the scaler as plain
+mean/scale arrays, training metadata and the SHA-256 of the booster. The
+booster is stored in XGBoost's native UBJSON format, so loading a bundle
+needs no pickle and does not depend on the scikit-learn version.
+"""
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"SCWXMDL\x00"
+FORMAT_VERSION = 1
+BUNDLE_SUFFIX = ".wxm"
+_LENGTH = struct.Struct("<I")
+
+
+class BundleError(ValueError):
+    """
+    Raised when a bundle is truncated, corrupted or of an unknown version
+    """
+
+
+class AffineScaler:
+    """
+    Feature scaler restored from a bundle: (X - mean) / scale
+    """
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class ModelBundle:
+    """
+    Content of a bundle file
+    """
+
+    def __init__(self, model, features, scaler, metadata):
+        self.model = model
+        self.features = features
+        self.scaler = scaler
+        self.metadata = metadata
+
+
+def bundle_path(path, target_feature, days_to_predict):
+    return os.path.join(path, f"model_{target_feature}_{days_to_predict}day{BUNDLE_SUFFIX}")
+
+
+def write_bundle(file_path, booster, features, mean, scale, metadata=None):
+    """
+    Write a bundle atomically
+
+    Args:
+        file_path (str): Destination file
+        booster (bytes): Booster serialized with save_raw("ubj")
+        features (list): Feature names, in model input order
+        mean (array): Scaler mean of each feature
+        scale (array): Scaler scale of each feature
+        metadata (dict): JSON-serializable training metadata
+    """
+    booster = bytes(booster)
+    header = json.dumps({
+        "format_version": FORMAT_VERSION,
+        "features": list(features),
+        "scaler": {
+            "mean": [float(v) for v in mean],
+            "scale": [float(v) for v in scale],
+        },
+        "metadata": metadata or {},
+        "booster_format": "ubj",
+        "booster_size": len(booster),
+        "booster_sha256": hashlib.sha256(booster).hexdigest(),
+    }).encode("utf-8")
+
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        f.write(booster)
+    # Readers never see a half-written bundle
+    os.replace(tmp_path, file_path)
+
+
+def read_bundle(file_path):
+    """
+    Read and verify a bundle without deserializing the booster
+
+    Args:
+        file_path (str): Bundle file
+
+    Returns:
+        tuple: (header dict, booster bytes)
+    """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        raise BundleError(f"{file_path} is not a weather model bundle")
+    offset = len(MAGIC)
+    if len(data) < offset + _LENGTH.size:
+        raise BundleError(f"{file_path} is truncated")
+    (header_size,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    try:
+        header = json.loads(data[offset:offset + header_size])
+    except ValueError:
+        raise BundleError(f"{file_path} has a corrupted header")
+    if header.get("format_version") != FORMAT_VERSION:
+        raise BundleError(f"Unsupported bundle version {header.get('format_version')}")
+
+    booster = data[offset + header_size:]
+    if len(booster) != header["booster_size"] or hashlib.sha256(booster).hexdigest() != header["booster_sha256"]:
+        raise BundleError(f"{file_path} failed its checksum")
+    return header, booster
+
+
+def load_bundle(file_path):
+    """
+    Load a bundle
+
+    Args:
+        file_path (str): Bundle file
+
+    Returns:
+        ModelBundle: Restored regressor, feature names, scaler and metadata
+    """
+    import xgboost as xgb
+
+    header, raw = read_bundle(file_path)
+    model = xgb.XGBRegressor()
+    model.load_model(bytearray(raw))
+    scaler = AffineScaler(header["scaler"]["mean"], header["scaler"]["scale"])
+    return ModelBundle(model, header["features"], scaler, header["metadata"])
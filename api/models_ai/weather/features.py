@@ -0,0 +1,285 @@
+"""
+Feature builder shared by weather model training and inference.
+
+Training computes the whole feature matrix at once; inference only computes
+the last row from a tail buffer of TAIL_DAYS days. Both follow the same
+definitions, so a model always sees at inference time the features it was
+trained on.
+"""
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Columns turned into lag and rolling-mean features
+LAG_COLUMNS = ["TX", "TN", "RR", "FFM"]
+LAGS = list(range(1, 8))
+ROLLING_WINDOWS = [3, 7, 14]
+# Days of history needed to compute the last row
+TAIL_DAYS = max(max(LAGS) + 1, max(ROLLING_WINDOWS))
+
+# Last TAIL_DAYS days of a station, parsed once: float32 values (TAIL_DAYS x
+# len(columns)), base column names and date of the last day
+Tail = namedtuple("Tail", ["values", "columns", "last_date"])
+
+
+def feature_names(columns):
+    """
+    Names of the features built from the given base columns
+
+    Args:
+        columns (list): Base columns, in data order
+
+    Returns:
+        list: Feature names, in the order of the built matrix
+    """
+    lag_columns = [col for col in LAG_COLUMNS if col in columns]
+    names = list(columns)
+    names += [f"{col}_lag_{i}" for i in LAGS for col in lag_columns]
+    names += [f"{col}_rolling_{w}" for w in ROLLING_WINDOWS for col in lag_columns]
+    names += ["dayofyear", "month"]
+    return names
+
+
+def calendar_features(dates):
+    """
+    Day of year and month of each date
+
+    Args:
+        dates (np.ndarray): datetime64 dates
+
+    Returns:
+        tuple: (dayofyear, month) float arrays
+    """
+    days = np.asarray(dates, dtype="datetime64[D]")
+    dayofyear = (days - days.astype("datetime64[Y]")).astype(np.int64) + 1
+    month = days.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    return dayofyear.astype(np.float64), month.astype(np.float64)
+
+
+def rolling_mean(values, window):
+    """
+    Trailing rolling mean, NaN until the window is full or if it holds a NaN
+
+    Args:
+        values (np.ndarray): Array of shape (N, C)
+        window (int): Window length
+
+    Returns:
+        np.ndarray: Array of shape (N, C)
+    """
+    out = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return out
+    nan = np.isnan(values)
+    zeros = np.zeros((1, values.shape[1]))
+    sums = np.cumsum(np.vstack((zeros, np.where(nan, 0.0, values))), axis=0)
+    nans = np.cumsum(np.vstack((zeros, nan)), axis=0)
+    window_sum = sums[window:] - sums[:-window]
+    window_nans = nans[window:] - nans[:-window]
+    out[window - 1:] = np.where(window_nans > 0, np.nan, window_sum / window)
+    return out
+
+
+def build_matrix(values, columns, dates):
+    """
+    Build the full feature matrix (training mode)
+
+    Args:
+        values (np.ndarray): Daily values, shape (N, len(columns))
+        columns (list): Base column names
+        dates (np.ndarray): datetime64 date of each row
+
+    Returns:
+        np.ndarray: Feature matrix, shape (N, len(feature_names(columns))),
+            NaN where lags or rolling windows are incomplete
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    lag_idx = [columns.index(col) for col in LAG_COLUMNS if col in columns]
+    lagged = values[:, lag_idx]
+
+    blocks = [values]
+    for i in LAGS:
+        shifted = np.full(lagged.shape, np.nan)
+        if i < n:
+            shifted[i:] = lagged[:-i]
+        blocks.append(shifted)
+    for window in ROLLING_WINDOWS:
+        blocks.append(rolling_mean(lagged, window))
+    dayofyear, month = calendar_features(dates)
+    blocks.append(np.column_stack((dayofyear, month)))
+    return np.hstack(blocks)
+
+
+def build_last_row(tail, columns, last_date):
+    """
+    Build only the last row of the feature matrix (inference mode)
+
+    Args:
+        tail (np.ndarray): Last TAIL_DAYS days of values, shape (>= TAIL_DAYS, len(columns))
+        columns (list): Base column names
+        last_date (np.datetime64): Date of the last row
+
+    Returns:
+        np.ndarray: Feature vector, same layout as a row of build_matrix
+    """
+    tail = np.asarray(tail)
+    if tail.dtype.kind != "f":
+        tail = tail.astype(np.float64)
+    if len(tail) < TAIL_DAYS:
+        raise ValueError(f"At least {TAIL_DAYS} days are needed, got {len(tail)}")
+    lag_idx = [columns.index(col) for col in LAG_COLUMNS if col in columns]
+    lagged = tail[:, lag_idx]
+
+    parts = [tail[-1]]
+    # Lags 1..7 are rows -2..-8, most recent first
+    parts.append(lagged[-2:-2 - len(LAGS):-1].ravel())
+    parts += [lagged[-window:].mean(axis=0) for window in ROLLING_WINDOWS]
+    dayofyear, month = calendar_features([last_date])
+    parts.append(np.array([dayofyear[0], month[0]], dtype=tail.dtype))
+    return np.concatenate(parts)
+
+
+def frame_to_arrays(df, columns=None):
+    """
+    Convert a daily weather DataFrame into the arrays used by the builder
+
+    Args:
+        df (pd.DataFrame): Daily data with a DATE column or a DatetimeIndex
+        columns (list): Base columns to keep, defaults to every numeric column
+
+    Returns:
+        tuple: (values float array, columns list, datetime64[D] dates)
+    """
+    if "DATE" in df.columns:
+        dates = pd.to_datetime(df["DATE"]).to_numpy(dtype="datetime64[D]")
+        df = df.drop(columns=["DATE"])
+    else:
+        dates = df.index.to_numpy(dtype="datetime64[D]")
+    if columns is None:
+        columns = list(df.select_dtypes(include="number").columns)
+    values = df[list(columns)].to_numpy(dtype=np.float64)
+    return values, list(columns), dates
+
+
+class FeatureRow:
+    """
+    Last feature row of a station, shared by every model predicting from it
+    """
+
+    def __init__(self, values, names):
+        self.values = values
+        self.names = names
+        # Models cache their column selection per layout
+        self.key = tuple(names)
+        self.index = {name: i for i, name in enumerate(names)}
+
+    def positions(self, names):
+        """
+        Positions of features in the row
+
+        Args:
+            names (list): Feature names expected by a model
+
+        Returns:
+            np.ndarray: Integer positions, in the order of names
+        """
+        missing = [name for name in names if name not in self.index]
+        if missing:
+            raise KeyError(f"Missing features: {missing}")
+        return np.array([self.index[name] for name in names], dtype=np.intp)
+
+    def select(self, names):
+        """
+        Pick features by name
+
+        Args:
+            names (list): Feature names expected by a model
+
+        Returns:
+            np.ndarray: Array of shape (1, len(names))
+        """
+        return self.values[self.positions(names)][None, :]
+
+
+def fill_missing(values, columns, fill_values=None):
+    """
+    Fill the missing values of a tail the way training did
+
+    Args:
+        values (np.ndarray): Tail values, NaN where missing
+        columns (list): Base column names
+        fill_values (dict): Training median of each column; columns without
+            one (models saved before medians were recorded) fall back to
+            the mean of the window
+
+    Returns:
+        np.ndarray: Values without NaN, same dtype
+    """
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        fills = np.nanmean(values, axis=0)
+    if fill_values:
+        fills = np.array([fill_values.get(col, mean) for col, mean in zip(columns, fills)])
+    return np.where(missing, fills, values).astype(values.dtype)
+
+
+def prepare_tail(df):
+    """
+    Parse the last TAIL_DAYS days of a daily DataFrame into a float32 tail
+
+    Missing values are kept: they depend on the model (training medians)
+    and are filled by build_row.
+
+    Args:
+        df (pd.DataFrame): Recent daily data (DATE column or DatetimeIndex)
+
+    Returns:
+        Tail: Parsed tail, None if there are fewer than TAIL_DAYS days
+    """
+    if len(df) < TAIL_DAYS:
+        return None
+    values, columns, dates = frame_to_arrays(df.tail(TAIL_DAYS))
+    values = values.astype(np.float32)
+    values.flags.writeable = False
+    return Tail(values, columns, dates[-1])
+
+
+def build_row(tail, fill_values=None):
+    """
+    Build the feature row of the last day of a tail
+
+    Args:
+        tail (Tail): Tail from prepare_tail
+        fill_values (dict): Training medians used for missing values
+
+    Returns:
+        FeatureRow: float32 feature row
+    """
+    values = fill_missing(tail.values, tail.columns, fill_values)
+    return FeatureRow(
+        build_last_row(values, tail.columns, tail.last_date),
+        feature_names(tail.columns),
+    )
+
+
+def build_inference_row(df, fill_values=None):
+    """
+    Build the feature row used for inference from recent daily data
+
+    Args:
+        df (pd.DataFrame): Recent daily data (DATE column or DatetimeIndex)
+        fill_values (dict): Training medians used for missing values
+
+    Returns:
+        FeatureRow: Feature row of the last day
+    """
+    tail = prepare_tail(df)
+    if tail is None:
+        raise ValueError(f"At least {TAIL_DAYS} days are needed, got {len(df)}")
+    return build_row(tail, fill_values)
@@ -0,0 +1,151 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from api.models_ai.weather.bundle import BUNDLE_SUFFIX, bundle_path
+from api.models_ai.weather.weather_prediction_model import WeatherPredictionModel
+
+MODEL_FILE_RE = re.compile(
+    r"^model_(?P<feature>\w+?)_(?P<days>\d+)day(\.joblib|" + re.escape(BUNDLE_SUFFIX) + r")$"
+)
+
+
+class _Entry:
+    def __init__(self, version, model):
+        self.version = version
+        self.model = model
+        self.checked_at = time.monotonic()
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of deserialized weather models
+
+    Entries are keyed by (feature, days) and tagged with a version made of
+    the mtime and size of the model files (the bundle, or the legacy joblib
+    files), so a retrained model replaces the cached one. Files are only
+    stat'ed every WEATHER_MODEL_STAT_SECONDS; in between, a prediction costs
+    no disk I/O and no deserialization. The cache
+    holds at most WEATHER_MODEL_CACHE_SIZE models (least recently used
+    models are evicted first).
+    """
+
+    def __init__(self, path=None, max_size=None):
+        """
+        Args:
+            path (str): Directory of the saved models, defaults to WEATHER_MODEL_DIR
+            max_size (int): LRU bound, defaults to WEATHER_MODEL_CACHE_SIZE
+        """
+        self.path = path or settings.WEATHER_MODEL_DIR
+        self.max_size = max_size or settings.WEATHER_MODEL_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def model_files(self, feature, days):
+        bundle = bundle_path(self.path, feature, days)
+        if os.path.exists(bundle):
+            return [bundle]
+        # Legacy joblib files
+        return [
+            os.path.join(self.path, f"model_{feature}_{days}day.joblib"),
+            os.path.join(self.path, f"scaler_{feature}_{days}day.joblib"),
+            os.path.join(self.path, f"features_{feature}_{days}day.txt"),
+        ]
+
+    def version(self, feature, days):
+        """
+        Version of the saved files of a model
+
+        Returns:
+            tuple: (mtime_ns, size) of each file, None if a file is missing
+        """
+        try:
+            return tuple(
+                (st.st_mtime_ns, st.st_size)
+                for st in (os.stat(f) for f in self.model_files(feature, days))
+            )
+        except FileNotFoundError:
+            return None
+
+    def get(self, feature, days):
+        """
+        Get a loaded model, loading it from disk on first use or after a change
+
+        Args:
+            feature (str): Target feature (TX, TN, ...)
+            days (int): Number of days ahead
+
+        Returns:
+            WeatherPredictionModel: Loaded model, None if no model is saved
+        """
+        key = (feature, days)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry.checked_at < settings.WEATHER_MODEL_STAT_SECONDS:
+                self._entries.move_to_end(key)
+                return entry.model
+
+        version = self.version(feature, days)
+        if version is None:
+            self.invalidate(feature, days)
+            return None
+        if entry and entry.version == version:
+            with self._lock:
+                entry.checked_at = time.monotonic()
+            return entry.model
+
+        model = WeatherPredictionModel(target_feature=feature, days_to_predict=days)
+        if not model.load_model(self.path):
+            return None
+        with self._lock:
+            self._entries[key] = _Entry(version, model)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return model
+
+    def invalidate(self, feature=None, days=None):
+        """
+        Drop cached models, all of them when no key is given
+        """
+        with self._lock:
+            if feature is None:
+                self._entries.clear()
+            else:
+                self._entries.pop((feature, days), None)
+
+    def available(self):
+        """
+        List the saved models
+
+        Returns:
+            list: (feature, days) tuples
+        """
+        if not os.path.isdir(self.path):
+            return []
+        found = set()
+        for name in os.listdir(self.path):
+            match = MODEL_FILE_RE.match(name)
+            if match:
+                found.add((match["feature"], int(match["days"])))
+        return sorted(found)
+
+    def preload(self):
+        """
+        Load every saved model, up to the LRU bound
+
+        Returns:
+            int: Number of loaded models
+        """
+        loaded = 0
+        for feature, days in self.available()[: self.max_size]:
+            if self.get(feature, days) is not None:
+                loaded += 1
+        return loaded
+
+
+weather_model_registry = ModelRegistry()
@@ -1,15 +1,22 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-import matplotlib.pyplot as plt
-import seaborn as sns
-import joblib
 import os
 import time
-import xgboost as xgb
+
+from api.models_ai.weather import features
+from api.models_ai.weather.bundle import bundle_path, load_bundle, write_bundle
+
+# Hyperparameters of every weather model
+XGB_PARAMS = {
+    "n_estimators": 100,
+    "max_depth": 6,
+    "learning_rate": 0.1,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "reg_alpha": 0.01,
+    "reg_lambda": 1,
+    "random_state": 42,
+}
 
 
 class WeatherPredictionModel:
@@ -23,6 +30,7 @@ class WeatherPredictionModel:
         input_features=None,
         target_feature="TX",
         days_to_predict=1,
+        n_jobs=-1,
     ):
         """
         Initialize the model
@@ -32,15 +40,26 @@ class WeatherPredictionModel:
             input_features (list): List of features to use for prediction
             target_feature (str): Weather variable to predict (e.g., 'TX' for max temperature)
             days_to_predict (int): Number of days ahead to predict
+            n_jobs (int): XGBoost threads, -1 to use every core
         """
         self.data_path = data_path
         self.target_feature = target_feature
         self.input_features = input_features or ["RR", "TN", "TM", "TX", "TAMPLI"]
         self.days_to_predict = days_to_predict
+        self.n_jobs = n_jobs
         self.model = None
         self.scaler = None
         self.features = None
         self.weather_data = None
+        self.metrics = None
+        # Last training day and reference validation RMSE, used by update_model
+        self.trained_until = None
+        self.baseline_rmse = None
+        # Training median of each column, also used to fill missing values at inference
+        self.fill_values = None
+        # Inference fast path, built on first prediction
+        self._fast = None
+        self._positions = {}
 
     def load_data(self):
         """
@@ -75,10 +94,10 @@ class WeatherPredictionModel:
             print(f"Using only {len(available_columns)} columns: {available_columns}")
             print(f"Missing values before cleaning:\n{df.isnull().sum()}")
 
-            # For numeric columns, fill NaN with the median
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
-            for col in numeric_cols:
-                df[col] = df[col].fillna(df[col].median())
+            # For numeric columns, fill NaN with the median, saved for inference
+            self.fill_values = self.column_medians(df)
+            for col, median in self.fill_values.items():
+                df[col] = df[col].fillna(median)
 
             # Remove rows still containing NaN values in critical columns
             if self.target_feature in df.columns:
@@ -131,10 +150,10 @@ class WeatherPredictionModel:
                 if col != "DATE":  # Skip date column
                     df[col] = df[col].astype(str).str.replace(",", ".").astype(float)
 
-            # For numeric columns, fill NaN with the median
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
-            for col in numeric_cols:
-                df[col] = df[col].fillna(df[col].median())
+            # For numeric columns, fill NaN with the median, saved for inference
+            self.fill_values = self.column_medians(df)
+            for col, median in self.fill_values.items():
+                df[col] = df[col].fillna(median)
 
             # Remove rows still containing NaN values in critical columns
             if self.target_feature in df.columns:
@@ -150,12 +169,23 @@ class WeatherPredictionModel:
             print(f"Error loading data from DataFrame: {e}")
             return None
 
-    def preprocess_data(self):
+    @staticmethod
+    def column_medians(df):
         """
-        Preprocess data for modeling: feature engineering and data splitting
+        Median of each numeric column, the value missing observations are filled with
 
         Returns:
-            tuple: X_train, X_test, y_train, y_test
+            dict: Column name -> median, columns without any value left out
+        """
+        medians = df.select_dtypes(include=[np.number]).median()
+        return {col: float(value) for col, value in medians.items() if not np.isnan(value)}
+
+    def build_dataset(self):
+        """
+        Build the feature matrix and the target of the loaded data
+
+        Returns:
+            tuple: X, y and the date of each row, rows with NaN dropped
         """
         if self.weather_data is None:
             if self.data_path:
@@ -169,58 +199,47 @@ class WeatherPredictionModel:
         for col in df.select_dtypes(include=["object"]).columns:
             df[col] = df[col].str.replace(",", ".").astype(float)
 
-        # Create lag features (previous days' values)
-        for i in range(1, 8):  # Past 7 days as features
-            for col in [
-                "TX",
-                "TN",
-                "RR",
-                "FFM",
-            ]:  # Max temp, min temp, precipitation, wind
-                if col in df.columns:
-                    df[f"{col}_lag_{i}"] = df[col].shift(i)
-
-        # Create rolling window features (averages over different periods)
-        for window in [3, 7, 14]:
-            for col in ["TX", "TN", "RR", "FFM"]:
-                if col in df.columns:
-                    df[f"{col}_rolling_{window}"] = (
-                        df[col].rolling(window=window).mean()
-                    )
-
-        # Add day of year as a feature (seasonal patterns)
-        df["dayofyear"] = df.index.dayofyear
-        df["month"] = df.index.month
-
-        # Create target variable (future temperature)
-        df[f"{self.target_feature}_target"] = df[self.target_feature].shift(
-            -self.days_to_predict
-        )
+        # Lags, rolling windows and calendar features, shared with inference
+        values, columns, dates = features.frame_to_arrays(df)
+        X = features.build_matrix(values, columns, dates)
 
-        # Drop rows with NaN due to shifts
-        df = df.dropna()
+        # Create target variable (future value of the target feature)
+        target = values[:, columns.index(self.target_feature)]
+        y = np.full(len(target), np.nan)
+        y[: len(target) - self.days_to_predict] = target[self.days_to_predict:]
 
-        # Prepare features and target
-        y = df[f"{self.target_feature}_target"]
+        # Drop rows with NaN due to shifts
+        valid = ~np.isnan(X).any(axis=1) & ~np.isnan(y)
+        X, y, dates = X[valid], y[valid], dates[valid]
 
-        # Exclude the target column and any date columns
-        exclude_cols = [f"{self.target_feature}_target"]
-        X = df.drop(columns=exclude_cols)
+        # Store features for later use in prediction
+        self.features = features.feature_names(columns)
 
-        print(f"Features used for training: {X.columns.tolist()}")
+        print(f"Features used for training: {self.features}")
         print(f"Target variable: {self.target_feature}_target")
         print(f"Shape of features: {X.shape}")
         print(f"Shape of target: {y.shape}")
 
-        # Store features for later use in prediction
-        self.features = X.columns.tolist()
+        return X, y, dates
 
-        # Split the data
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, shuffle=False
-        )
+    def preprocess_data(self):
+        """
+        Preprocess data for modeling: feature engineering and data splitting
+
+        Returns:
+            tuple: X_train, X_test, y_train, y_test
+        """
+        X, y, dates = self.build_dataset()
+
+        # Split the data chronologically, the last 20% being the test set
+        split = len(X) - int(np.ceil(len(X) * 0.2))
+        X_train, X_test = X[:split], X[split:]
+        y_train, y_test = y[:split], y[split:]
 
         # Scale the features
+        # Training-only dependency, kept out of the serving import path
+        from sklearn.preprocessing import StandardScaler
+
         self.scaler = StandardScaler()
         X_train_scaled = self.scaler.fit_transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
@@ -230,8 +249,8 @@ class WeatherPredictionModel:
             X_test_scaled,
             y_train,
             y_test,
-            X_train.index,
-            X_test.index,
+            dates[:split],
+            dates[split:],
         )
 
     def build_model(self):
@@ -241,6 +260,9 @@ class WeatherPredictionModel:
         Returns:
             xgb.XGBRegressor: The trained model
         """
+        import xgboost as xgb
+        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
         # Preprocess data
         X_train_scaled, X_test_scaled, y_train, y_test, train_idx, test_idx = (
             self.preprocess_data()
@@ -250,17 +272,7 @@ class WeatherPredictionModel:
         print("Training XGBoost model...")
         start_time = time.time()
 
-        xgb_model = xgb.XGBRegressor(
-            n_estimators=100,
-            max_depth=6,
-            learning_rate=0.1,
-            subsample=0.8,
-            colsample_bytree=0.8,
-            reg_alpha=0.01,
-            reg_lambda=1,
-            random_state=42,
-            n_jobs=-1,
-        )
+        xgb_model = xgb.XGBRegressor(**XGB_PARAMS, n_jobs=self.n_jobs)
 
         # Train the model
         xgb_model.fit(
@@ -306,11 +318,87 @@ class WeatherPredictionModel:
             "training_time": training_time,
         }
 
+        self.metrics = metrics
+        self.trained_until = str(train_idx[-1])
+        self.baseline_rmse = float(test_rmse)
         return xgb_model, metrics
 
+    def update_model(self, new_trees=10, drift_ratio=0.2, max_trees=300):
+        """
+        Keep training the loaded booster on the days that arrived since it was trained
+
+        The loaded model is first evaluated on the new days. If its RMSE
+        exceeds the baseline (validation RMSE of the last full training) by
+        more than drift_ratio, or if the booster would grow past max_trees,
+        the model is retrained from scratch instead. Otherwise new_trees
+        trees are added on the new days only, keeping the saved scaler.
+
+        Args:
+            new_trees (int): Trees added by an incremental update
+            drift_ratio (float): Tolerated RMSE degradation before a full retrain
+            max_trees (int): Booster size that triggers a full retrain
+
+        Returns:
+            tuple: (mode, metrics), mode being "incremental", "full", "drift"
+                or "unchanged"
+        """
+        import xgboost as xgb
+        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+
+        saved_features = self.features
+        X, y, dates = self.build_dataset()
+        if (
+            self.model is None
+            or self.trained_until is None
+            or self.baseline_rmse is None
+            or self.features != saved_features
+        ):
+            print("No incremental state for this model, full retrain")
+            return "full", self.build_model()[1]
+
+        new = dates > np.datetime64(self.trained_until)
+        if not new.any():
+            print(f"No new days since {self.trained_until}")
+            return "unchanged", {}
+
+        start_time = time.time()
+        X_new = self.scaler.transform(X[new])
+        y_new = y[new]
+
+        # Drift check on days the booster has never seen
+        y_pred = self.model.predict(X_new)
+        rmse = float(np.sqrt(mean_squared_error(y_new, y_pred)))
+        if rmse > self.baseline_rmse * (1 + drift_ratio):
+            print(f"RMSE {rmse:.2f} on new days exceeds baseline {self.baseline_rmse:.2f}, full retrain")
+            return "drift", self.build_model()[1]
+
+        booster = self.model.get_booster()
+        if booster.num_boosted_rounds() + new_trees > max_trees:
+            print(f"Booster would exceed {max_trees} trees, full retrain")
+            return "full", self.build_model()[1]
+
+        params = {**XGB_PARAMS, "n_estimators": new_trees}
+        xgb_model = xgb.XGBRegressor(**params, n_jobs=self.n_jobs)
+        xgb_model.fit(X_new, y_new, xgb_model=booster, verbose=False)
+
+        training_time = time.time() - start_time
+        print(f"Added {new_trees} trees on {int(new.sum())} new days in {training_time:.2f} seconds")
+
+        self.model = xgb_model
+        self.trained_until = str(dates[-1])
+        metrics = {
+            "test_rmse": rmse,
+            "test_mae": float(mean_absolute_error(y_new, y_pred)),
+            "test_r2": float(r2_score(y_new, y_pred)) if len(y_new) > 1 else float("nan"),
+            "training_time": training_time,
+            "new_days": int(new.sum()),
+        }
+        self.metrics = metrics
+        return "incremental", metrics
+
     def save_model(self, path="models"):
         """
-        Save the trained model and scaler
+        Save the trained model, its scaler and its features as a single bundle
 
         Args:
             path (str): Directory to save the model
@@ -327,26 +415,29 @@ class WeatherPredictionModel:
             if not os.path.exists(path):
                 os.makedirs(path)
 
-            # Save the model
-            model_file = os.path.join(
-                path, f"model_{self.target_feature}_{self.days_to_predict}day.joblib"
-            )
-            joblib.dump(self.model, model_file)
-
-            # Save the scaler
-            scaler_file = os.path.join(
-                path, f"scaler_{self.target_feature}_{self.days_to_predict}day.joblib"
+            import xgboost as xgb
+
+            metadata = {
+                "target_feature": self.target_feature,
+                "days_to_predict": self.days_to_predict,
+                "trained_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "xgboost_version": xgb.__version__,
+                "metrics": {key: float(value) for key, value in (self.metrics or {}).items()},
+                "trained_until": self.trained_until,
+                "baseline_rmse": self.baseline_rmse,
+                "n_trees": self.model.get_booster().num_boosted_rounds(),
+                "fill_values": self.fill_values,
+            }
+            write_bundle(
+                bundle_path(path, self.target_feature, self.days_to_predict),
+                self.model.get_booster().save_raw("ubj"),
+                self.features,
+                self.scaler.mean_,
+                self.scaler.scale_,
+                metadata,
             )
-            joblib.dump(self.scaler, scaler_file)
 
-            # Save features list
-            features_file = os.path.join(
-                path, f"features_{self.target_feature}_{self.days_to_predict}day.txt"
-            )
-            with open(features_file, "w") as f:
-                f.write("\n".join(self.features))
-
-            print(f"Model and associated files saved to {path}")
+            print(f"Model bundle saved to {path}")
             return True
 
         except Exception as e:
@@ -357,6 +448,9 @@ class WeatherPredictionModel:
         """
         Load a previously saved model and scaler
 
+        The single-file bundle is used when it exists, otherwise the legacy
+        joblib files (model, scaler and features list).
+
         Args:
             path (str): Directory where the model is saved
 
@@ -364,6 +458,23 @@ class WeatherPredictionModel:
             bool: True if successful, False otherwise
         """
         try:
+            file_path = bundle_path(path, self.target_feature, self.days_to_predict)
+            if os.path.exists(file_path):
+                bundle = load_bundle(file_path)
+                self.model = bundle.model
+                self.scaler = bundle.scaler
+                self.features = bundle.features
+                self.metrics = bundle.metadata.get("metrics")
+                self.trained_until = bundle.metadata.get("trained_until")
+                self.baseline_rmse = bundle.metadata.get("baseline_rmse")
+                self.fill_values = bundle.metadata.get("fill_values")
+                print(f"Model bundle loaded from {path}")
+                return True
+
+            # Legacy files are pickles: joblib, XGBoost and scikit-learn are
+            # only imported for them
+            import joblib
+
             # Load the model
             model_file = os.path.join(
                 path, f"model_{self.target_feature}_{self.days_to_predict}day.joblib"
@@ -390,12 +501,49 @@ class WeatherPredictionModel:
             print(f"Error loading model: {e}")
             return False
 
-    def make_prediction(self, latest_data):
+    @staticmethod
+    def build_inference_row(latest_data, fill_values=None):
         """
-        Make a prediction using the trained model
+        Build the feature row used for inference
+
+        Only the last row is computed, from the last TAIL_DAYS days. It does
+        not depend on the target or the horizon, so it can be shared by the
+        models trained on the same medians.
 
         Args:
-            latest_data (pd.DataFrame): Latest weather data with required features
+            latest_data (pd.DataFrame): Latest weather data
+            fill_values (dict): Training medians used for missing values
+
+        Returns:
+            FeatureRow: Features of the last day
+        """
+        return features.build_inference_row(latest_data, fill_values)
+
+    def _fast_path(self):
+        """
+        Fold the scaler into a float32 affine transform and grab the booster
+
+        Returns:
+            tuple: (weight, bias, booster) so that prediction is
+                booster.inplace_predict(x * weight + bias)
+        """
+        if self._fast is None or self._fast[3] is not self.model:
+            weight = (1.0 / np.asarray(self.scaler.scale_, dtype=np.float64)).astype(np.float32)
+            bias = (-np.asarray(self.scaler.mean_, dtype=np.float64) * weight).astype(np.float32)
+            self._fast = (weight, bias, self.model.get_booster(), self.model)
+            self._positions = {}
+        return self._fast[:3]
+
+    def predict_from_row(self, row):
+        """
+        Make a prediction from a feature row built by build_inference_row
+
+        The columns of the model are picked with cached positions, scaled
+        with a fused affine transform and passed to the booster without
+        building a DMatrix.
+
+        Args:
+            row (FeatureRow): Feature row
 
         Returns:
             float: Predicted value
@@ -404,56 +552,82 @@ class WeatherPredictionModel:
             print("No model available. Please train or load a model first.")
             return None
 
-        # Prepare the data similar to training
-        df = latest_data.copy()
+        weight, bias, booster = self._fast_path()
+        positions = self._positions.get(row.key)
+        if positions is None:
+            try:
+                positions = row.positions(self.features)
+            except KeyError as e:
+                print(f"Error: {e}")
+                return None
+            self._positions[row.key] = positions
 
-        # Convert comma-separated decimal values to periods
-        for col in df.select_dtypes(include=["object"]).columns:
-            if col != "DATE":
-                df[col] = df[col].astype(str).str.replace(",", ".").astype(float)
-
-        # Create lag features (previous days' values)
-        for i in range(1, 8):  # Past 7 days as features
-            for col in [
-                "TX",
-                "TN",
-                "RR",
-                "FFM",
-            ]:  # Max temp, min temp, precipitation, wind
-                if col in df.columns:
-                    df[f"{col}_lag_{i}"] = df[col].shift(i)
-
-        # Create rolling window features (averages over different periods)
-        for window in [3, 7, 14]:
-            for col in ["TX", "TN", "RR", "FFM"]:
-                if col in df.columns:
-                    df[f"{col}_rolling_{window}"] = (
-                        df[col].rolling(window=window).mean()
-                    )
-
-        # Add day of year as a feature (seasonal patterns)
-        df["dayofyear"] = df.index.dayofyear
-        df["month"] = df.index.month
-
-        # Drop rows with NaN due to shifts and rolling windows
-        df = df.dropna()
-
-        if df.empty:
-            print("No valid data available for prediction after preprocessing")
-            return None
+        x = row.values[positions].astype(np.float32, copy=False) * weight + bias
+        prediction = booster.inplace_predict(x[None, :])
+
+        return float(prediction[0])
 
-        # Take the last row for prediction
-        latest_row = df.iloc[-1:][self.features]
+    def make_prediction(self, latest_data):
+        """
+        Make a prediction using the trained model
 
-        if not all(feature in latest_row.columns for feature in self.features):
-            missing = [f for f in self.features if f not in latest_row.columns]
-            print(f"Error: Missing features: {missing}")
+        Args:
+            latest_data (pd.DataFrame): Latest weather data with required features
+
+        Returns:
+            float: Predicted value
+        """
+        if self.model is None:
+            print("No model available. Please train or load a model first.")
+            return None
+
+        if len(latest_data) < features.TAIL_DAYS:
+            print(f"At least {features.TAIL_DAYS} days of data are needed for prediction")
             return None
 
-        # Scale features
-        X_scaled = self.scaler.transform(latest_row)
+        return self.predict_from_row(self.build_inference_row(latest_data, self.fill_values))
 
-        # Make prediction
-        prediction = self.model.predict(X_scaled)
 
-        return prediction[0]
+def train_model(
+    data,
+    target_feature,
+    days_to_predict,
+    path,
+    n_jobs=-1,
+    incremental=False,
+    new_trees=10,
+    drift_ratio=0.2,
+    max_trees=300,
+):
+    """
+    Train, evaluate and save one model
+
+    Only depends on its arguments, so it can run in a worker process.
+
+    Args:
+        data (pd.DataFrame): Training data with a DATE column
+        target_feature (str): Feature to predict
+        days_to_predict (int): Number of days ahead to predict
+        path (str): Directory to save the model
+        n_jobs (int): XGBoost threads
+        incremental (bool): Update the saved model instead of retraining it
+        new_trees (int): Trees added by an incremental update
+        drift_ratio (float): Tolerated RMSE degradation before a full retrain
+        max_trees (int): Booster size that triggers a full retrain
+
+    Returns:
+        dict: Evaluation metrics and training mode
+    """
+    model = WeatherPredictionModel(
+        target_feature=target_feature, days_to_predict=days_to_predict, n_jobs=n_jobs
+    )
+    # load_data_from_dataframe sets the index in place
+    if model.load_data_from_dataframe(data.copy()) is None:
+        raise ValueError("Failed to prepare training data")
+    if incremental and model.load_model(path):
+        mode, metrics = model.update_model(new_trees, drift_ratio, max_trees)
+    else:
+        mode, (_, metrics) = "full", model.build_model()
+    if mode != "unchanged" and not model.save_model(path):
+        raise ValueError("Failed to save model")
+    return {"mode": mode, **{key: float(value) for key, value in metrics.items()}}
@@ -3,7 +3,7 @@ from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from api.models import Alerte, AlertThreshold
+from api.models import Alerte, AlerteArchive, AlertThreshold, TrainingJob
 
 
 class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
@@ -50,7 +50,28 @@ class AlerteSerializer(serializers.ModelSerializer):
         model = Alerte
         fields = '__all__'
 
+class AlerteListSerializer(serializers.ModelSerializer):
+    indicator = serializers.CharField(source="threshold.indicator_id", read_only=True, default=None)
+
+    class Meta:
+        model = Alerte
+        fields = (
+            'id', 'created_at', 'updated_at', 'closed_at', 'alert_type', 'status',
+            'triggered_by', 'threshold', 'indicator', 'value', 'peak_value',
+            'latitude', 'longitude', 'message',
+        )
+
+class AlerteArchiveListSerializer(AlerteListSerializer):
+    class Meta(AlerteListSerializer.Meta):
+        model = AlerteArchive
+        fields = AlerteListSerializer.Meta.fields + ('archived_at',)
+
 class AlertThresholdSerializer(serializers.ModelSerializer):
     class Meta:
         model = AlertThreshold
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class TrainingJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TrainingJob
+        fields = '__all__'
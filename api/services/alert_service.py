@@ -0,0 +1,256 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import Alerte
+from api.services.threshold_cache import get_snapshot
+from api.utils.aq_utils import INDICATOR_CODES
+
+
+def latest_per_location(measurements):
+    """
+    Keep only the most recent measurement of each location
+
+    Args:
+        measurements (iterable): AirQualityMeasurement instances
+
+    Returns:
+        list: One measurement per (latitude, longitude)
+    """
+    latest = {}
+    for m in measurements:
+        key = (m.latitude, m.longitude)
+        if key not in latest or m.datetime_utc > latest[key].datetime_utc:
+            latest[key] = m
+    return list(latest.values())
+
+
+def measurement_matrix(measurements):
+    """
+    Build the (locations x indicators) value matrix
+
+    Args:
+        measurements (list): One measurement per location
+
+    Returns:
+        np.ndarray: Float matrix, NaN where a value is missing
+    """
+    matrix = np.full((len(measurements), len(INDICATOR_CODES)), np.nan)
+    for i, m in enumerate(measurements):
+        for j, code in enumerate(INDICATOR_CODES):
+            value = getattr(m, code, None)
+            if value is not None:
+                matrix[i, j] = value
+    return matrix
+
+
+def _episode_message(code, value, threshold_value, latitude, longitude):
+    return (
+        f"Threshold exceeded for {code}: {value} "
+        f"(threshold: {threshold_value}) at ({latitude}, {longitude})"
+    )
+
+
+def load_episodes(thresholds, locations, now):
+    """
+    Load the automatic alert episodes that may still evolve
+
+    An episode may evolve while it is open, or while it is closed but still
+    inside its cooldown window (a new breach then reopens it), see is_tracked.
+
+    Args:
+        thresholds (ThresholdArray): Thresholds being evaluated
+        locations (list): Measurements being evaluated, one per location
+        now (datetime): Evaluation time
+
+    Returns:
+        dict: Latest episode keyed by (threshold_id, latitude, longitude)
+    """
+    cooldown_start = now - timedelta(minutes=settings.ALERT_COOLDOWN_MINUTES)
+    qs = (
+        Alerte.objects.filter(
+            triggered_by="auto",
+            threshold_id__in=thresholds.ids.tolist(),
+            latitude__in={m.latitude for m in locations},
+            longitude__in={m.longitude for m in locations},
+        )
+        .filter(Q(status="open") | Q(closed_at__gte=cooldown_start))
+        .order_by("created_at")
+    )
+    return {(a.threshold_id, a.latitude, a.longitude): a for a in qs}
+
+
+def close_threshold_episodes(threshold_ids, now=None):
+    """
+    Close the open automatic episodes of deactivated thresholds
+
+    The evaluator only tracks episodes of active thresholds, so an episode
+    left open when its threshold is turned off would never close (nor be
+    archived). Call it in the transaction that deactivates the thresholds.
+
+    Args:
+        threshold_ids (list): Thresholds being deactivated
+        now (datetime): Closing time, defaults to now
+
+    Returns:
+        int: Number of closed episodes
+    """
+    now = now or timezone.now()
+    return Alerte.objects.filter(
+        triggered_by="auto", threshold_id__in=threshold_ids, status="open"
+    ).update(status="closed", closed_at=now, updated_at=now)
+
+
+def breach_masks(values, thresholds, hysteresis_ratio):
+    """
+    Where values breach their thresholds and where they leave the hysteresis band
+
+    A value breaches at or above its threshold and an episode closes below
+    threshold * (1 - hysteresis_ratio). Thresholds at or below zero have no
+    band (it would be empty or inverted, and an episode on a non-negative
+    metric with a zero threshold could never close): they breach strictly
+    above the threshold and close at or below it. Shared by the evaluator and
+    the threshold backtest.
+
+    Args:
+        values (np.ndarray): Measured values, broadcastable against thresholds
+        thresholds (np.ndarray): Threshold values
+        hysteresis_ratio (float): Width of the hysteresis band
+
+    Returns:
+        tuple: (above, below) boolean arrays, both False where values are NaN
+    """
+    no_band = thresholds <= 0
+    close_levels = np.where(no_band, thresholds, thresholds * (1 - hysteresis_ratio))
+    with np.errstate(invalid="ignore"):
+        above = np.where(no_band, values > thresholds, values >= thresholds)
+        below = np.where(no_band, values <= close_levels, values < close_levels)
+    return above, below
+
+
+def is_tracked(episode, now):
+    """
+    Whether an episode may still evolve, the condition load_episodes queries
+
+    Args:
+        episode (Alerte): Automatic episode
+        now (datetime): Evaluation time
+    """
+    cooldown_start = now - timedelta(minutes=settings.ALERT_COOLDOWN_MINUTES)
+    return episode.status == "open" or (
+        episode.closed_at is not None and episode.closed_at >= cooldown_start
+    )
+
+
+def plan_episodes(locations, thresholds, episodes, now):
+    """
+    Apply one evaluation to the tracked episodes, without touching the database
+
+    Args:
+        locations (list): Measurements, one per location
+        thresholds (ThresholdArray): Thresholds being evaluated
+        episodes (dict): Tracked episodes keyed by (threshold_id, latitude, longitude)
+        now (datetime): Evaluation time
+
+    Returns:
+        dict: Alerte instances grouped as "opened" (new, unsaved), "updated"
+            and "closed" (modified in place)
+    """
+    result = {"opened": [], "updated": [], "closed": []}
+    values = measurement_matrix(locations)[:, thresholds.columns]
+    above, below = breach_masks(values, thresholds.values, settings.ALERT_HYSTERESIS_RATIO)
+
+    # Cells that need attention: new breaches and every tracked episode
+    cells = set(zip(*(idx.tolist() for idx in np.nonzero(above))))
+    loc_index = {(m.latitude, m.longitude): i for i, m in enumerate(locations)}
+    thr_index = {threshold_id: j for j, threshold_id in enumerate(thresholds.ids.tolist())}
+    for threshold_id, lat, lon in episodes:
+        if (lat, lon) in loc_index and threshold_id in thr_index:
+            cells.add((loc_index[(lat, lon)], thr_index[threshold_id]))
+
+    for i, j in sorted(cells):
+        m = locations[i]
+        code = thresholds.codes[j]
+        threshold_id = int(thresholds.ids[j])
+        value = float(values[i, j])
+        episode = episodes.get((threshold_id, m.latitude, m.longitude))
+
+        if episode is None:
+            result["opened"].append(Alerte(
+                created_at=now,
+                updated_at=now,
+                triggered_by="auto",
+                threshold_id=threshold_id,
+                latitude=m.latitude,
+                longitude=m.longitude,
+                value=value,
+                peak_value=value,
+                message=_episode_message(code, value, thresholds.values[j], m.latitude, m.longitude),
+                alert_type="critical",
+                status="open",
+            ))
+            continue
+
+        if np.isnan(value):
+            continue
+        if episode.status == "open" and below[i, j]:
+            episode.status = "closed"
+            episode.closed_at = now
+            result["closed"].append(episode)
+        elif episode.status == "open" or above[i, j]:
+            if episode.status == "closed":
+                episode.status = "open"
+                episode.closed_at = None
+            if above[i, j]:
+                episode.occurrences += 1
+            episode.peak_value = max(episode.peak_value or value, value)
+            episode.message = _episode_message(code, value, thresholds.values[j], m.latitude, m.longitude)
+            result["updated"].append(episode)
+        else:
+            continue
+        episode.value = value
+        episode.updated_at = now
+
+    return result
+
+
+def evaluate_measurements(measurements, thresholds=None):
+    """
+    Evaluate active alert thresholds against stored measurements
+
+    Runs as a pipeline stage after ingestion: it only looks at the rows it
+    is given and never calls the upstream API itself, so alerts always
+    agree with the data served by the history endpoints. All thresholds are
+    compared against all locations in one array operation.
+
+    Alerts are stateful episodes: a breach opens an episode, which is then
+    updated in place on each evaluation and only closes once the value
+    leaves the hysteresis band. A breach within the cooldown after closing
+    reopens the same episode. Writes are one bulk insert and one bulk update.
+
+    Args:
+        measurements (iterable): AirQualityMeasurement instances
+        thresholds (ThresholdArray): Thresholds to evaluate, defaults to the
+            shared active-threshold snapshot
+
+    Returns:
+        dict: Alerte instances grouped as "opened", "updated" and "closed"
+    """
+    locations = latest_per_location(measurements)
+    if thresholds is None:
+        thresholds = get_snapshot().thresholds
+    if not locations or not len(thresholds):
+        return {"opened": [], "updated": [], "closed": []}
+
+    now = timezone.now()
+    result = plan_episodes(locations, thresholds, load_episodes(thresholds, locations, now), now)
+
+    Alerte.objects.bulk_create(result["opened"])
+    Alerte.objects.bulk_update(
+        result["updated"] + result["closed"],
+        ["status", "value", "peak_value", "occurrences", "message", "updated_at", "closed_at"],
+    )
+    return result
@@ -0,0 +1,131 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class CircuitOpen(Exception):
+    """
+    Upstream API considered down: calls fail fast until it is probed again
+    """
+
+    def __init__(self, api, retry_after):
+        super().__init__(f"{api} is unavailable, retry in {retry_after:.0f}s")
+        self.api = api
+        self.retry_after = retry_after
+
+
+def _keys(api):
+    prefix = f"upstream:breaker:{api}"
+    return f"{prefix}:failures", f"{prefix}:opened_at", f"{prefix}:probe"
+
+
+def allow(api):
+    """
+    Check whether a call to an upstream API may go through
+
+    The breaker state lives in the Django cache, so every web and scheduler
+    process sees the same one. While open, calls are rejected; once
+    UPSTREAM_BREAKER_COOLDOWN_SECONDS have passed, a single caller is let
+    through as a probe (half-open) and its outcome closes or reopens it.
+
+    Args:
+        api (str): Upstream API, key of UPSTREAM_RATE_LIMITS
+
+    Returns:
+        bool: True when the call is the half-open probe
+
+    Raises:
+        CircuitOpen: When the call must not be made
+    """
+    _, opened_key, probe_key = _keys(api)
+    opened_at = cache.get(opened_key)
+    if opened_at is None:
+        return False
+    retry_after = opened_at + settings.UPSTREAM_BREAKER_COOLDOWN_SECONDS - time.time()
+    if retry_after > 0:
+        raise CircuitOpen(api, retry_after)
+    if not cache.add(probe_key, 1, settings.UPSTREAM_BREAKER_PROBE_SECONDS):
+        # Another process is probing: wait for its outcome
+        raise CircuitOpen(api, settings.UPSTREAM_BREAKER_PROBE_SECONDS)
+    return True
+
+
+def record(api, ok, probe=False):
+    """
+    Record the outcome of a call
+
+    Errors, 429 / 5xx answers and calls slower than the latency SLO are
+    failures; UPSTREAM_BREAKER_FAILURES consecutive failures, or a failed
+    probe, open the breaker. A success closes it.
+
+    Args:
+        api (str): Upstream API
+        ok (bool): Whether the call succeeded within its SLO
+        probe (bool): Whether the call was the half-open probe
+    """
+    failures_key, opened_key, probe_key = _keys(api)
+    if ok:
+        if probe or cache.get(failures_key):
+            cache.delete_many([failures_key, opened_key, probe_key])
+        return
+
+    if not cache.add(failures_key, 1, None):
+        try:
+            failures = cache.incr(failures_key)
+        except ValueError:
+            # Reset by a success in another process meanwhile
+            failures = 1
+            cache.set(failures_key, 1, None)
+    else:
+        failures = 1
+    if probe or failures >= settings.UPSTREAM_BREAKER_FAILURES:
+        cache.set(opened_key, time.time(), None)
+        cache.delete(probe_key)
+        if not probe:
+            print(f"Circuit breaker of {api} opened after {failures} failures")
+
+
+def release(api, probe):
+    """
+    Give the probe back when the call was not made
+    """
+    if probe:
+        cache.delete(_keys(api)[2])
+
+
+def is_failure(api, status_code, elapsed, latency_slo=None):
+    """
+    Whether an upstream answer counts against the breaker
+
+    Args:
+        api (str): Upstream API
+        status_code (int): HTTP status of the answer
+        elapsed (float): Duration of the call in seconds
+        latency_slo (float): Latency SLO of the call in seconds, defaults to
+            the API's UPSTREAM_LATENCY_SLO_SECONDS
+    """
+    if latency_slo is None:
+        latency_slo = settings.UPSTREAM_LATENCY_SLO_SECONDS[api]
+    return status_code == 429 or status_code >= 500 or elapsed > latency_slo
+
+
+def breaker_status():
+    """
+    State of the breaker of every upstream API
+
+    Returns:
+        dict: state (closed, open or half_open) and consecutive failures per API
+    """
+    status = {}
+    for api in settings.UPSTREAM_RATE_LIMITS:
+        failures_key, opened_key, _ = _keys(api)
+        opened_at = cache.get(opened_key)
+        if opened_at is None:
+            state = "closed"
+        elif time.time() - opened_at < settings.UPSTREAM_BREAKER_COOLDOWN_SECONDS:
+            state = "open"
+        else:
+            state = "half_open"
+        status[api] = {"state": state, "failures": cache.get(failures_key, 0)}
+    return status
@@ -0,0 +1,278 @@
+import asyncio
+import threading
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from api.models import DailyObservation
+from api.models_ai.weather import features
+from api.services.meteofrance import AsyncMeteoFranceAPI
+
+# DPClim column -> DailyObservation field
+OBSERVATION_COLUMNS = {
+    "RR": "rr",
+    "TN": "tn",
+    "TX": "tx",
+    "TM": "tm",
+    "TAMPLI": "tampli",
+    "FFM": "ffm",
+}
+# Longest period placed in a single DPClim order
+ORDER_MAX_DAYS = 365
+
+
+def missing_ranges(missing, max_days=ORDER_MAX_DAYS):
+    """
+    Group missing dates into contiguous ranges
+
+    Args:
+        missing (list): Sorted missing dates
+        max_days (int): Maximum length of a range
+
+    Returns:
+        list: (start, end) tuples, both inclusive
+    """
+    ranges = []
+    for day in missing:
+        if ranges and day - ranges[-1][1] == timedelta(days=1) and (day - ranges[-1][0]).days < max_days:
+            ranges[-1][1] = day
+        else:
+            ranges.append([day, day])
+    return [tuple(r) for r in ranges]
+
+
+class ClimatologyCache:
+    """
+    Daily climatology shared by every worker, backed by DailyObservation
+
+    The scheduler syncs the table once a day and only orders the dates that
+    are missing, with every DPClim order in flight at once. Web workers and training read slices of the table through
+    one indexed query and never place a DPClim order. Each process keeps
+    the frames it read in memory for CLIMATOLOGY_MEMO_SECONDS.
+    """
+
+    def __init__(self):
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def date_range(days_back, today=None):
+        """
+        Date range covered by a slice
+
+        Args:
+            days_back (int): Number of days of history
+            today (date): Reference day, defaults to today
+
+        Returns:
+            tuple: (start, end) dates, end being 2 days ago to ensure data availability
+        """
+        end = (today or date.today()) - timedelta(days=2)
+        return end - timedelta(days=days_back), end
+
+    def sync(self, station_id, days_back, api_key):
+        """
+        Order the missing days of a station and store them
+
+        Args:
+            station_id (str): ID of the weather station
+            days_back (int): Number of days of history to keep complete
+            api_key (str): Météo France API key
+
+        Returns:
+            int: Number of stored observations
+        """
+        return self.sync_many([station_id], days_back, api_key)[station_id]
+
+    def missing_orders(self, station_id, days_back):
+        """
+        DPClim orders covering the missing days of a station
+
+        Returns:
+            list: (station_id, start, end) tuples, dates in ISO 8601 format
+        """
+        start, end = self.date_range(days_back)
+        existing = set(
+            DailyObservation.objects.filter(
+                station_id=station_id, date__range=(start, end)
+            ).values_list("date", flat=True)
+        )
+        missing = [
+            start + timedelta(days=i)
+            for i in range((end - start).days + 1)
+            if start + timedelta(days=i) not in existing
+        ]
+        return [
+            (
+                station_id,
+                range_start.strftime("%Y-%m-%dT00:00:00Z"),
+                range_end.strftime("%Y-%m-%dT23:59:59Z"),
+            )
+            for range_start, range_end in missing_ranges(missing)
+        ]
+
+    def sync_many(self, station_ids, days_back, api_key):
+        """
+        Order the missing days of several stations at once
+
+        Every order is in flight at the same time; each export is parsed and
+        stored as soon as it is ready.
+
+        Args:
+            station_ids (list): IDs of the weather stations
+            days_back (int): Number of days of history to keep complete
+            api_key (str): Météo France API key
+
+        Returns:
+            dict: Number of stored observations per station
+        """
+        orders = [order for station_id in station_ids for order in self.missing_orders(station_id, days_back)]
+        stored = {station_id: 0 for station_id in station_ids}
+        if not orders:
+            return stored
+
+        api = AsyncMeteoFranceAPI(
+            api_key,
+            max_in_flight=settings.DPCLIM_MAX_IN_FLIGHT,
+            poll_initial=settings.DPCLIM_POLL_INITIAL_SECONDS,
+            poll_max=settings.DPCLIM_POLL_MAX_SECONDS,
+            order_timeout=settings.DPCLIM_ORDER_TIMEOUT_SECONDS,
+            latency_slo=settings.UPSTREAM_DPCLIM_LATENCY_SLO_SECONDS,
+        )
+        store = sync_to_async(self.store)
+
+        async def run():
+            async for station_id, df in api.fetch_many(orders):
+                if df is not None:
+                    stored[station_id] += await store(station_id, df)
+
+        asyncio.run(run())
+        if any(stored.values()):
+            # Slices read before the sync miss the new days
+            self.clear()
+        return stored
+
+    def clear(self):
+        """
+        Forget the slices kept in memory by this process
+        """
+        with self._lock:
+            self._memo = {}
+
+    @staticmethod
+    def store(station_id, df):
+        """
+        Upsert a parsed DPClim export
+
+        Args:
+            station_id (str): ID of the weather station
+            df (pd.DataFrame): Parsed export with a DATE column
+
+        Returns:
+            int: Number of stored observations
+        """
+        if df is None or df.empty or "DATE" not in df.columns:
+            return 0
+        columns = {}
+        for column, field in OBSERVATION_COLUMNS.items():
+            if column in df.columns:
+                columns[field] = pd.to_numeric(
+                    df[column].astype(str).str.replace(",", "."), errors="coerce"
+                )
+        now = timezone.now()
+        observations = []
+        for i, day in enumerate(df["DATE"].dt.date):
+            values = {
+                field: (None if pd.isna(series.iloc[i]) else float(series.iloc[i]))
+                for field, series in columns.items()
+            }
+            observations.append(DailyObservation(
+                station_id=station_id, date=day, fetched_at=now, **values
+            ))
+        DailyObservation.objects.bulk_create(
+            observations,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["station_id", "date"],
+            update_fields=list(OBSERVATION_COLUMNS.values()) + ["fetched_at"],
+        )
+        return len(observations)
+
+    def _slice(self, station_id, days_back):
+        start, end = self.date_range(days_back)
+        key = (station_id, start, end)
+        with self._lock:
+            memo = self._memo.get(key)
+            if memo is None or time.monotonic() - memo[0] > settings.CLIMATOLOGY_MEMO_SECONDS:
+                df = self.load(station_id, start, end)
+                # The inference tail is parsed once per slice
+                tail = features.prepare_tail(df) if df is not None else None
+                memo = (time.monotonic(), df, tail)
+                # Drop slices of previous days
+                self._memo = {k: v for k, v in self._memo.items() if k[2] == end}
+                self._memo[key] = memo
+        return memo
+
+    def get(self, station_id, days_back=30):
+        """
+        Read recent daily data of a station
+
+        Args:
+            station_id (str): ID of the weather station
+            days_back (int): Number of days back to return
+
+        Returns:
+            pd.DataFrame: Recent weather data with a DATE column, None if the
+                station was never synced
+        """
+        df = self._slice(station_id, days_back)[1]
+        if df is None:
+            return None
+        # Callers mutate the frame (set_index, ...), hand out a copy
+        return df.copy()
+
+    def tail(self, station_id, days_back=30):
+        """
+        Last days of a station, parsed for inference
+
+        Args:
+            station_id (str): ID of the weather station
+            days_back (int): Slice the tail is taken from
+
+        Returns:
+            Tail: Read-only float32 tail, None if less than TAIL_DAYS days are stored
+        """
+        return self._slice(station_id, days_back)[2]
+
+    @staticmethod
+    def load(station_id, start, end):
+        """
+        Load a slice of observations in one indexed query
+
+        Args:
+            station_id (str): ID of the weather station
+            start (date): First day
+            end (date): Last day
+
+        Returns:
+            pd.DataFrame: Observations with a DATE column, None if empty
+        """
+        fields = list(OBSERVATION_COLUMNS.values())
+        rows = list(
+            DailyObservation.objects.filter(station_id=station_id, date__range=(start, end))
+            .order_by("date")
+            .values_list("date", *fields)
+        )
+        if not rows:
+            return None
+        df = pd.DataFrame(rows, columns=["DATE"] + list(OBSERVATION_COLUMNS))
+        df["DATE"] = pd.to_datetime(df["DATE"])
+        df[list(OBSERVATION_COLUMNS)] = df[list(OBSERVATION_COLUMNS)].astype(float)
+        return df
+
+
+climatology_cache = ClimatologyCache()
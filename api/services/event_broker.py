@@ -0,0 +1,251 @@
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from api.models import AirQualityMeasurement, Alerte
+from api.serializers import AlerteSerializer
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "smart_city_events"
+# PostgreSQL caps NOTIFY payloads at 8000 bytes; ids are sent in chunks.
+NOTIFY_CHUNK = 500
+
+
+def notify(kind, ids):
+    """
+    Announce new or changed rows to the web processes
+
+    Sends a PostgreSQL NOTIFY carrying only the row ids; listeners reload
+    the rows themselves. On other databases this is a no-op and brokers
+    fall back to polling.
+
+    Args:
+        kind (str): Event kind, "alerte" or "measurement"
+        ids (list): Primary keys of the rows
+    """
+    ids = [pk for pk in ids if pk is not None]
+    if not ids or connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        for i in range(0, len(ids), NOTIFY_CHUNK):
+            payload = json.dumps({"kind": kind, "ids": ids[i:i + NOTIFY_CHUNK]})
+            cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, payload])
+
+
+def serialize_measurement(m):
+    return {
+        "id": m.id,
+        "latitude": m.latitude,
+        "longitude": m.longitude,
+        "datetime": m.datetime_utc.isoformat(),
+        "aqi": m.aqi,
+        "co": m.co,
+        "no": m.no,
+        "no2": m.no2,
+        "o3": m.o3,
+        "so2": m.so2,
+        "pm2_5": m.pm2_5,
+        "pm10": m.pm10,
+        "nh3": m.nh3,
+    }
+
+
+def load_events(kind, ids):
+    """
+    Load and serialize the rows referenced by a notification
+
+    Args:
+        kind (str): Event kind, "alerte" or "measurement"
+        ids (list): Primary keys of the rows
+
+    Returns:
+        list: Serialized rows
+    """
+    if kind == "alerte":
+        return AlerteSerializer(Alerte.objects.filter(id__in=ids).order_by("id"), many=True).data
+    if kind == "measurement":
+        return [
+            serialize_measurement(m)
+            for m in AirQualityMeasurement.objects.filter(id__in=ids).order_by("id")
+        ]
+    return []
+
+
+class EventBroker:
+    """
+    In-process fan-out of alert and measurement events to SSE subscribers
+
+    A single feed per process listens on PostgreSQL LISTEN/NOTIFY, or polls
+    the tables when LISTEN is unavailable, and pushes every event to the
+    queue of each subscriber. While polling, LISTEN is retried with an
+    exponential backoff. The feed only runs while someone subscribes.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._task = None
+        self._poll_cursor = None
+
+    def subscribe(self, kinds):
+        """
+        Register a subscriber
+
+        Args:
+            kinds (set): Event kinds the subscriber wants
+
+        Returns:
+            asyncio.Queue: Queue receiving (kind, payload) tuples
+        """
+        queue = asyncio.Queue(maxsize=settings.SSE_QUEUE_SIZE)
+        self._subscribers[queue] = kinds
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.pop(queue, None)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def publish(self, kind, items):
+        for queue, kinds in list(self._subscribers.items()):
+            if kind not in kinds:
+                continue
+            for item in items:
+                try:
+                    queue.put_nowait((kind, item))
+                except asyncio.QueueFull:
+                    # Slow consumer: drop rather than block the whole feed
+                    break
+
+    async def _dispatch(self, kind, ids):
+        if any(kind in kinds for kinds in self._subscribers.values()):
+            self.publish(kind, await sync_to_async(load_events)(kind, ids))
+
+    async def _run(self):
+        if connection.vendor != "postgresql":
+            await self._poll()
+            return
+
+        delay = settings.SSE_LISTEN_RETRY_SECONDS
+        poller = None
+        try:
+            while True:
+                try:
+                    conn = await asyncio.to_thread(self._connect)
+                    if poller is not None:
+                        poller.cancel()
+                        poller = None
+                        # Rows written between the last poll and LISTEN
+                        await self._catch_up()
+                        logger.info("LISTEN restored, polling stopped")
+                    delay = settings.SSE_LISTEN_RETRY_SECONDS
+                    await self._listen(conn)
+                except Exception as e:
+                    if poller is None:
+                        poller = asyncio.create_task(self._poll())
+                    logger.warning(
+                        "LISTEN unavailable, polling every %ss and retrying in %ss: %s",
+                        settings.SSE_POLL_SECONDS, delay, e,
+                    )
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, settings.SSE_LISTEN_RETRY_MAX_SECONDS)
+        finally:
+            if poller is not None:
+                poller.cancel()
+
+    @staticmethod
+    def _connect():
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        db = settings.DATABASES["default"]
+        conn = psycopg2.connect(
+            dbname=db["NAME"],
+            user=db["USER"],
+            password=db["PASSWORD"],
+            host=db["HOST"],
+            port=db["PORT"],
+        )
+        try:
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    async def _listen(self, conn):
+        try:
+            loop = asyncio.get_running_loop()
+            readable = asyncio.Event()
+            loop.add_reader(conn.fileno(), readable.set)
+            try:
+                while True:
+                    await readable.wait()
+                    readable.clear()
+                    conn.poll()
+                    while conn.notifies:
+                        notification = conn.notifies.pop(0)
+                        payload = json.loads(notification.payload)
+                        await self._dispatch(payload["kind"], payload["ids"])
+            finally:
+                loop.remove_reader(conn.fileno())
+        finally:
+            conn.close()
+
+    async def _poll(self):
+        self._poll_cursor = await sync_to_async(self._poll_start)()
+        while True:
+            await asyncio.sleep(settings.SSE_POLL_SECONDS)
+            await self._catch_up()
+
+    async def _catch_up(self):
+        if self._poll_cursor is None:
+            return
+        self._poll_cursor, alert_ids, measurement_ids = await sync_to_async(self._poll_once)(
+            self._poll_cursor
+        )
+        if alert_ids:
+            await self._dispatch("alerte", alert_ids)
+        if measurement_ids:
+            await self._dispatch("measurement", measurement_ids)
+
+    @staticmethod
+    def _poll_start():
+        return {
+            "alert_id": Alerte.objects.aggregate(m=Max("id"))["m"] or 0,
+            "measurement_id": AirQualityMeasurement.objects.aggregate(m=Max("id"))["m"] or 0,
+            "updated_at": timezone.now(),
+        }
+
+    @staticmethod
+    def _poll_once(cursor):
+        now = timezone.now()
+        alert_ids = list(
+            Alerte.objects.filter(
+                Q(id__gt=cursor["alert_id"]) | Q(updated_at__gt=cursor["updated_at"])
+            ).order_by("id").values_list("id", flat=True)
+        )
+        measurement_ids = list(
+            AirQualityMeasurement.objects.filter(id__gt=cursor["measurement_id"])
+            .order_by("id").values_list("id", flat=True)
+        )
+        cursor = {
+            "alert_id": max(alert_ids + [cursor["alert_id"]]),
+            "measurement_id": max(measurement_ids + [cursor["measurement_id"]]),
+            "updated_at": now,
+        }
+        return cursor, alert_ids, measurement_ids
+
+
+broker = EventBroker()
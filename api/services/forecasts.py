@@ -0,0 +1,202 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from api.models import WeatherForecast
+from api.models_ai.weather.registry import weather_model_registry
+from api.services import training_jobs
+from api.services.climatology import climatology_cache
+from api.services.weather_service import (
+    FEATURE_NAMES,
+    MAX_DAYS_AHEAD,
+    WEATHER_FEATURES,
+    WeatherPredictionService,
+    feature_unit,
+)
+
+
+def json_observation(observation):
+    """
+    Make an observation row JSON-serializable (dates as ISO strings, NaN as None)
+    """
+    data = {}
+    for key, value in observation.items():
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()[:10]
+        elif isinstance(value, float) and math.isnan(value):
+            value = None
+        data[key] = value
+    return data
+
+
+def refresh_forecasts(station_ids=None, features=None, horizons=None):
+    """
+    Compute and store the forecasts of every (station, feature, horizon)
+
+    Runs in the scheduler after the climatology sync and after model
+    updates. Missing models are queued for training and skipped.
+
+    Args:
+        station_ids (list): Stations, defaults to WEATHER_STATION_ID
+        features (list): Features, defaults to all of them
+        horizons (list): Days ahead, defaults to 1 to MAX_DAYS_AHEAD
+
+    Returns:
+        dict: Number of stored forecasts, of forecasts waiting for a model and
+            of deleted forecasts of past days
+    """
+    station_ids = station_ids or [settings.WEATHER_STATION_ID]
+    stored = pending = 0
+    for station_id in station_ids:
+        service = WeatherPredictionService(None, station_id=station_id)
+        result = service.predict_grid(features, horizons)
+        if not result["success"]:
+            print(f"Forecasts of {station_id} not refreshed: {result['error']}")
+            continue
+
+        latest_data = json_observation(result["context"]["latest_data"])
+        base_date = climatology_cache.tail(station_id).last_date.item()
+        now = timezone.now()
+        forecasts = []
+        for feature, cells in result["grid"].items():
+            for days, cell in cells.items():
+                if cell["value"] is None:
+                    pending += 1
+                    continue
+                forecasts.append(WeatherForecast(
+                    station_id=station_id,
+                    feature=feature,
+                    days=int(days),
+                    base_date=base_date,
+                    target_date=base_date + timedelta(days=int(days)),
+                    value=cell["value"],
+                    latest_data=latest_data,
+                    computed_at=now,
+                ))
+        WeatherForecast.objects.bulk_create(
+            forecasts,
+            update_conflicts=True,
+            unique_fields=["station_id", "feature", "days"],
+            update_fields=["base_date", "target_date", "value", "latest_data", "computed_at"],
+        )
+        stored += len(forecasts)
+
+    # Forecasts of past days are never served again
+    deleted, _ = WeatherForecast.objects.filter(target_date__lt=timezone.localdate()).delete()
+    return {"stored": stored, "pending": pending, "deleted": deleted}
+
+
+def forecast_grid(features=None, horizons=None, station_id=None):
+    """
+    Read stored forecasts as a feature x horizon grid, in one indexed query
+
+    No model is loaded: a missing forecast only queues a training job when
+    the model file does not exist yet. Forecasts of past days are ignored,
+    in case the scheduler could not refresh them.
+
+    Args:
+        features (list): Features, defaults to all of them
+        horizons (list): Days ahead, defaults to 1 to MAX_DAYS_AHEAD
+        station_id (str): Station, defaults to WEATHER_STATION_ID
+
+    Returns:
+        dict: Same layout as WeatherPredictionService.predict_grid
+    """
+    features = features or WEATHER_FEATURES
+    horizons = horizons or list(range(1, MAX_DAYS_AHEAD + 1))
+    station_id = station_id or settings.WEATHER_STATION_ID
+
+    stored = {
+        (f.feature, f.days): f
+        for f in WeatherForecast.objects.filter(
+            station_id=station_id,
+            feature__in=features,
+            days__in=horizons,
+            target_date__gte=timezone.localdate(),
+        )
+    }
+
+    grid = {}
+    pending_jobs = []
+    latest = None
+    for feature in features:
+        grid[feature] = {}
+        for days in horizons:
+            forecast = stored.get((feature, days))
+            if forecast is not None:
+                latest = latest or forecast
+                cell = {
+                    "value": forecast.value,
+                    "prediction_date": forecast.target_date.isoformat(),
+                }
+            elif weather_model_registry.version(feature, days) is None:
+                job = training_jobs.enqueue(feature, days)
+                pending_jobs.append(job.id)
+                cell = {"value": None, "job_id": job.id, "job_status": job.status}
+            else:
+                # Model trained, forecast not computed yet by the scheduler
+                cell = {"value": None}
+            grid[feature][str(days)] = cell
+
+    return {
+        "success": True,
+        "grid": grid,
+        "units": {feature: feature_unit(feature) for feature in features},
+        "pending_jobs": pending_jobs,
+        "context": {
+            "latest_data": latest.latest_data if latest else None,
+            "station_id": station_id,
+            "computed_at": latest.computed_at if latest else None,
+        },
+    }
+
+
+def get_forecast(feature, days, station_id=None):
+    """
+    Read one stored forecast
+
+    Args:
+        feature (str): Feature (TX, TN, RR, etc.)
+        days (int): Days ahead
+        station_id (str): Station, defaults to WEATHER_STATION_ID
+
+    Returns:
+        dict: Same layout as WeatherPredictionService.predict_weather
+    """
+    result = forecast_grid([feature], [days], station_id)
+    cell = result["grid"][feature][str(days)]
+    if cell.get("job_id"):
+        return {
+            "success": False,
+            "error": "Model not trained yet, a training job is in progress",
+            "job_id": cell["job_id"],
+            "job_status": cell["job_status"],
+            "prediction": None,
+            "context": None,
+        }
+    if cell["value"] is None:
+        return {
+            "success": False,
+            "error": "Forecast not computed yet, forecasts are refreshed daily by the scheduler",
+            "prediction": None,
+            "context": None,
+        }
+    return {
+        "success": True,
+        "prediction": {
+            "value": cell["value"],
+            "unit": feature_unit(feature),
+            "feature": FEATURE_NAMES.get(feature, feature),
+            "days_ahead": days,
+            "prediction_date": cell["prediction_date"],
+        },
+        "context": {
+            **result["context"],
+            "model_info": {
+                "target_feature": feature,
+                "days_to_predict": days,
+            },
+        },
+    }
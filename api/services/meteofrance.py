@@ -0,0 +1,185 @@
+import asyncio
+import random
+import httpx
+import pandas as pd
+from io import StringIO
+
+from api.services.upstream_budget import INGESTION
+from api.utils import upstream
+
+DPCLIM_BASE_URL = "https://public-api.meteofrance.fr/public/DPClim/v1"
+
+
+def parse_climatology_csv(data_str):
+    """
+    Parse a DPClim daily CSV export
+
+    Args:
+        data_str (str): Raw CSV content (semicolon separated)
+
+    Returns:
+        pd.DataFrame: Daily data with a datetime DATE column
+    """
+    df = pd.read_csv(StringIO(data_str), sep=";")
+    if "DATE" in df.columns:
+        df["DATE"] = pd.to_datetime(df["DATE"].astype(str), format="%Y%m%d")
+    return df
+
+
+class AsyncMeteoFranceAPI:
+    """
+    Asynchronous DPClim client keeping many orders in flight
+
+    Each order is created, then polled with an exponential backoff (with
+    jitter, honouring Retry-After) until its file is ready. Polling waits on
+    the event loop, so a dozen stations take about as long as one.
+    """
+
+    def __init__(
+        self,
+        api_key,
+        max_in_flight=10,
+        poll_initial=2.0,
+        poll_max=30.0,
+        order_timeout=600.0,
+        priority=INGESTION,
+        latency_slo=None,
+    ):
+        """
+        Args:
+            api_key (str): Your Météo France API key
+            max_in_flight (int): Maximum number of concurrent HTTP requests
+            poll_initial (float): First delay between two polls, in seconds
+            poll_max (float): Longest delay between two polls, in seconds
+            order_timeout (float): Time after which an order is given up, in seconds
+            priority (str): Rate limit priority class of the calls
+            latency_slo (float): Latency SLO of the order and poll calls, in
+                seconds; defaults to the meteofrance UPSTREAM_LATENCY_SLO_SECONDS
+        """
+        self.base_url = DPCLIM_BASE_URL
+        self.api_key = api_key
+        self.priority = priority
+        self.latency_slo = latency_slo
+        self.headers = {"apikey": f"{api_key}"}
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.order_timeout = order_timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def _get(self, client, url, params):
+        async with self._semaphore:
+            return await upstream.get_async(
+                client, upstream.METEOFRANCE, url, self.api_key, self.priority,
+                self.latency_slo, params=params, headers=self.headers,
+            )
+
+    def _next_delay(self, delay, response):
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return min(delay * 1.5, self.poll_max) * random.uniform(0.8, 1.2)
+
+    async def create_data_order(self, client, station_id, start_date, end_date, frequency="quotidienne"):
+        """
+        Create an order for climate data, retrying while rate limited
+
+        Args:
+            client (httpx.AsyncClient): HTTP client
+            station_id (str): ID of the weather station
+            start_date (str): Start date in ISO 8601 format
+            end_date (str): End date in ISO 8601 format
+            frequency (str): Data frequency - "quotidienne", "horaire", or "infrahoraire-6m"
+
+        Returns:
+            str: Order ID if successful, None otherwise
+        """
+        url = f"{self.base_url}/commande-station/{frequency}"
+        params = {"id-station": station_id, "date-deb-periode": start_date, "date-fin-periode": end_date}
+        delay = self.poll_initial
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.order_timeout
+        while True:
+            response = await self._get(client, url, params)
+            if response.status_code == 202:
+                try:
+                    return response.json()["elaboreProduitAvecDemandeResponse"]["return"]
+                except (KeyError, ValueError):
+                    print(f"Unexpected response format: {response.text}")
+                    return None
+            if response.status_code not in (429, 500, 502, 503) or loop.time() > deadline:
+                print(f"Error {response.status_code}: {response.text}")
+                return None
+            delay = self._next_delay(delay, response)
+            await asyncio.sleep(delay)
+
+    async def download_data(self, client, order_id):
+        """
+        Poll an order until its file is ready
+
+        Args:
+            client (httpx.AsyncClient): HTTP client
+            order_id (str): Order ID from create_data_order
+
+        Returns:
+            str: Data as string if successful, None otherwise
+        """
+        url = f"{self.base_url}/commande/fichier"
+        params = {"id-cmde": order_id}
+        delay = self.poll_initial
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.order_timeout
+        while loop.time() < deadline:
+            response = await self._get(client, url, params)
+            if response.status_code == 201:  # Data is ready
+                return response.content.decode("utf-8")
+            if response.status_code not in (204, 429, 500, 502, 503):
+                print(f"Error {response.status_code}: {response.text}")
+                return None
+            # Still processing or rate limited: wait longer each time
+            delay = self._next_delay(delay, response)
+            await asyncio.sleep(delay)
+
+        print(f"Timed out waiting for order {order_id}")
+        return None
+
+    async def fetch(self, client, station_id, start_date, end_date):
+        """
+        Order, download and parse one period of a station
+
+        Returns:
+            pd.DataFrame: Parsed data, None on failure
+        """
+        order_id = await self.create_data_order(client, station_id, start_date, end_date)
+        if not order_id:
+            return None
+        data_str = await self.download_data(client, order_id)
+        if not data_str:
+            return None
+        return parse_climatology_csv(data_str)
+
+    async def fetch_many(self, orders):
+        """
+        Run several orders concurrently and yield each result as soon as it is parsed
+
+        Args:
+            orders (list): (station_id, start_date, end_date) tuples, dates in ISO 8601 format
+
+        Yields:
+            tuple: (station_id, pd.DataFrame or None), in completion order
+        """
+        async with httpx.AsyncClient(timeout=30.0) as client:
+
+            async def run(station_id, start_date, end_date):
+                try:
+                    return station_id, await self.fetch(client, station_id, start_date, end_date)
+                except (httpx.HTTPError, *upstream.UNAVAILABLE_ERRORS) as e:
+                    print(f"Error fetching {station_id} ({start_date} - {end_date}): {e}")
+                    return station_id, None
+
+            tasks = [asyncio.create_task(run(*order)) for order in orders]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                for task in tasks:
+                    task.cancel()
@@ -0,0 +1,207 @@
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from api.models import AirQualityMeasurement
+from api.services.alert_service import breach_masks
+from api.utils.aq_utils import INDICATOR_INDEX
+
+
+def load_history(codes, since, latitude, longitude):
+    """
+    Load measurement history as columnar arrays in a single query
+
+    Args:
+        codes (list): Indicator codes to load
+        since (datetime): Start of the history window
+        latitude (float): Location latitude
+        longitude (float): Location longitude
+
+    Returns:
+        tuple: (times as datetime64[s] array, {code: float64 array})
+    """
+    rows = list(
+        AirQualityMeasurement.objects.filter(
+            latitude=latitude, longitude=longitude, datetime_utc__gte=since
+        )
+        .order_by("datetime_utc")
+        .values_list("datetime_utc", *codes)
+    )
+    if not rows:
+        return np.array([], dtype="datetime64[s]"), {code: np.array([]) for code in codes}
+    columns = list(zip(*rows))
+    times = np.array([dt.replace(tzinfo=None) for dt in columns[0]], dtype="datetime64[s]")
+    values = {code: np.asarray(col, dtype=np.float64) for code, col in zip(codes, columns[1:])}
+    return times, values
+
+
+def episode_state(values, thresholds, hysteresis_ratio):
+    """
+    Replay the live alert state machine for many thresholds at once
+
+    A cell is in alert from its first breach until the first value leaving
+    the hysteresis band, with the live evaluator's breach_masks. The last open/close event of each cell is carried
+    forward with a running maximum so no Python loop runs over time.
+
+    Args:
+        values (np.ndarray): Measurement series, shape (T,)
+        thresholds (np.ndarray): Candidate thresholds, shape (C,)
+        hysteresis_ratio (float): Width of the hysteresis band
+
+    Returns:
+        tuple: (above, state) boolean arrays of shape (C, T)
+    """
+    above, below = breach_masks(values[None, :], thresholds[:, None], hysteresis_ratio)
+    steps = np.arange(values.size)
+    last_event = np.maximum.accumulate(np.where(above | below, steps, -1), axis=1)
+    state = np.take_along_axis(above, np.maximum(last_event, 0), axis=1) & (last_event >= 0)
+    return above, state
+
+
+def merge_cooldown(starts, ends, times, cooldown):
+    """
+    Merge episodes that restart within the cooldown of the previous one
+
+    Args:
+        starts (np.ndarray): Episode start indices
+        ends (np.ndarray): Episode end indices (exclusive)
+        times (np.ndarray): Measurement times
+        cooldown (np.timedelta64): Cooldown window
+
+    Returns:
+        tuple: Merged (starts, ends)
+    """
+    if starts.size < 2:
+        return starts, ends
+    gaps = times[starts[1:]] - times[ends[:-1]]
+    new_episode = np.concatenate(([True], gaps > cooldown))
+    last_of_group = np.concatenate((new_episode[1:], [True]))
+    return starts[new_episode], ends[last_of_group]
+
+
+def replay(code, times, values, thresholds, hysteresis_ratio, cooldown, timeline=True):
+    """
+    Replay candidate thresholds of one indicator against a measurement series
+
+    Args:
+        code (str): Indicator code
+        times (np.ndarray): Measurement times, datetime64[s]
+        values (np.ndarray): Measurement series, shape (T,), T > 0
+        thresholds (np.ndarray): Candidate thresholds, shape (C,)
+        hysteresis_ratio (float): Width of the hysteresis band
+        cooldown (np.timedelta64): Cooldown window
+        timeline (bool): Include the list of episodes of each candidate
+
+    Returns:
+        list: One result per candidate
+    """
+    results = []
+    above, state = episode_state(values, thresholds, hysteresis_ratio)
+    # Rising and falling edges of the alert state
+    padded = np.pad(state, ((0, 0), (1, 1)))
+    edges = np.diff(padded.astype(np.int8), axis=1)
+    firing = above.sum(axis=1)
+    # Peak search needs a sentinel so episodes still open at the end work
+    peaks_source = np.append(values, -np.inf)
+
+    for c, threshold in enumerate(thresholds.tolist()):
+        starts = np.flatnonzero(edges[c] == 1)
+        ends = np.flatnonzero(edges[c] == -1)
+        starts, ends = merge_cooldown(starts, ends, np.append(times, times[-1]), cooldown)
+        end_times = np.where(ends < times.size, times[np.minimum(ends, times.size - 1)], times[-1])
+        hours = float(((end_times - times[starts]).astype(np.int64)).sum()) / 3600
+        entry = {
+            "indicator": code,
+            "threshold": threshold,
+            "firing_count": int(firing[c]),
+            "episode_count": int(starts.size),
+            "hours_in_alert": round(hours, 2),
+        }
+        if timeline:
+            peaks = (
+                np.maximum.reduceat(peaks_source, np.column_stack((starts, ends)).ravel())[::2]
+                if starts.size else []
+            )
+            entry["episodes"] = [
+                {
+                    "start": str(times[s]) + "Z",
+                    "end": str(times[e]) + "Z" if e < times.size else None,
+                    "peak": float(p),
+                }
+                for s, e, p in zip(starts.tolist(), ends.tolist(), list(peaks))
+            ]
+        results.append(entry)
+    return results
+
+
+def backtest(candidates, days, latitude, longitude, timeline=True):
+    """
+    Replay candidate thresholds against the measurement history
+
+    Args:
+        candidates (dict): Candidate threshold values keyed by indicator code
+        days (int): Number of days of history to replay
+        latitude (float): Location latitude
+        longitude (float): Location longitude
+        timeline (bool): Include the list of episodes of each candidate
+
+    Returns:
+        dict: Firing counts, episode counts and timelines per candidate
+    """
+    started = time.perf_counter()
+    now = timezone.now()
+    codes = list(candidates)
+    times, history = load_history(codes, now - timedelta(days=days), latitude, longitude)
+    ratio = settings.ALERT_HYSTERESIS_RATIO
+    cooldown = np.timedelta64(settings.ALERT_COOLDOWN_MINUTES * 60, "s")
+
+    results = []
+    for code in codes:
+        thresholds = np.asarray(candidates[code], dtype=np.float64)
+        values = history[code]
+        if values.size == 0:
+            for threshold in thresholds.tolist():
+                results.append({
+                    "indicator": code, "threshold": threshold, "firing_count": 0,
+                    "episode_count": 0, "hours_in_alert": 0.0, "episodes": [],
+                })
+            continue
+
+        results += replay(code, times, values, thresholds, ratio, cooldown, timeline)
+
+    return {
+        "from": str(times[0]) + "Z" if times.size else None,
+        "to": str(times[-1]) + "Z" if times.size else None,
+        "measurements": int(times.size),
+        "hysteresis_ratio": ratio,
+        "cooldown_minutes": settings.ALERT_COOLDOWN_MINUTES,
+        "results": results,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def validate_candidates(candidates):
+    """
+    Check the candidates payload of a backtest request
+
+    Args:
+        candidates (dict): Candidate threshold values keyed by indicator code
+
+    Returns:
+        str: Error message, None if the payload is valid
+    """
+    if not isinstance(candidates, dict) or not candidates:
+        return "candidates must be a non-empty object of indicator: [thresholds]"
+    for code, values in candidates.items():
+        if code not in INDICATOR_INDEX:
+            return f"Unknown indicator: {code}"
+        if not isinstance(values, list) or not values:
+            return f"Thresholds for {code} must be a non-empty list"
+        if len(values) > settings.BACKTEST_MAX_CANDIDATES:
+            return f"At most {settings.BACKTEST_MAX_CANDIDATES} thresholds per indicator"
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            return f"Thresholds for {code} must be numbers"
+    return None
@@ -0,0 +1,110 @@
+import threading
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F
+
+from api.models import AlertThreshold, CacheVersion
+from api.serializers import AlertThresholdSerializer
+from api.utils.aq_utils import INDICATOR_INDEX
+
+VERSION_KEY = "alert_threshold"
+
+
+class ThresholdArray:
+    """
+    Compact columnar view of the active alert thresholds
+    """
+
+    def __init__(self, ids, codes, values):
+        """
+        Args:
+            ids (list): AlertThreshold primary keys
+            codes (list): Indicator code of each threshold
+            values (list): Threshold value of each threshold
+        """
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.codes = list(codes)
+        self.columns = np.asarray(
+            [INDICATOR_INDEX[code] for code in self.codes], dtype=np.intp
+        )
+        self.values = np.asarray(values, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class ThresholdSnapshot:
+    """
+    Immutable in-memory copy of the active thresholds at a given version
+    """
+
+    def __init__(self, version, instances):
+        """
+        Args:
+            version (int): Version counter the snapshot was loaded at
+            instances (list): Active AlertThreshold instances
+        """
+        self.version = version
+        self.rows = AlertThresholdSerializer(instances, many=True).data
+        self.by_id = {row["id"]: row for row in self.rows}
+        known = [t for t in instances if t.indicator.code in INDICATOR_INDEX]
+        self.thresholds = ThresholdArray(
+            [t.id for t in known],
+            [t.indicator.code for t in known],
+            [t.threshold_value for t in known],
+        )
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def current_version():
+    """
+    Read the shared threshold version counter
+
+    Returns:
+        int: Current version, 0 if thresholds were never written
+    """
+    row = CacheVersion.objects.filter(key=VERSION_KEY).values_list("version", flat=True).first()
+    return row or 0
+
+
+def get_snapshot():
+    """
+    Get the active thresholds, reloading them only when the version changed
+
+    Callers should fetch the snapshot once per evaluation cycle or request
+    and use it throughout, so they see a consistent set of thresholds.
+
+    Returns:
+        ThresholdSnapshot: Snapshot of the active thresholds
+    """
+    global _snapshot
+    version = current_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            instances = list(
+                AlertThreshold.objects.filter(active=True).select_related("indicator")
+            )
+            _snapshot = ThresholdSnapshot(version, instances)
+        return _snapshot
+
+
+def invalidate():
+    """
+    Bump the shared version once the current transaction commits so every
+    process reloads its snapshot on its next read
+    """
+    def bump():
+        updated = CacheVersion.objects.filter(key=VERSION_KEY).update(version=F("version") + 1)
+        if not updated:
+            _, created = CacheVersion.objects.get_or_create(key=VERSION_KEY, defaults={"version": 1})
+            if not created:
+                CacheVersion.objects.filter(key=VERSION_KEY).update(version=F("version") + 1)
+
+    transaction.on_commit(bump)
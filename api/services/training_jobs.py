@@ -0,0 +1,110 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from api.models import TrainingJob
+from api.models_ai.weather.weather_prediction_model import train_model
+from api.services.climatology import climatology_cache
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def enqueue(feature, days):
+    """
+    Queue the training of a weather model, once
+
+    If a job for the same (feature, days) is already queued or running, that
+    job is returned instead of creating a new one.
+
+    Args:
+        feature (str): Target feature (TX, TN, ...)
+        days (int): Number of days ahead
+
+    Returns:
+        TrainingJob: The pending job
+    """
+    active = TrainingJob.objects.filter(feature=feature, days=days, status__in=ACTIVE_STATUSES)
+    job = active.first()
+    if job is not None:
+        return job
+    try:
+        with transaction.atomic():
+            return TrainingJob.objects.create(feature=feature, days=days)
+    except IntegrityError:
+        # Lost the race against another request: reuse its job
+        return active.first()
+
+
+def fail_stale_jobs():
+    """
+    Mark jobs left running by a crashed worker as failed
+
+    Returns:
+        int: Number of failed jobs
+    """
+    limit = timezone.now() - timedelta(minutes=settings.TRAINING_JOB_TIMEOUT_MINUTES)
+    return TrainingJob.objects.filter(status="running", started_at__lt=limit).update(
+        status="failed", finished_at=timezone.now(), error="Training timed out"
+    )
+
+
+def claim_next():
+    """
+    Claim the oldest queued job
+
+    Returns:
+        TrainingJob: The claimed job, now running, None if the queue is empty
+    """
+    with transaction.atomic():
+        job = (
+            TrainingJob.objects.filter(status="queued")
+            .order_by("created_at")
+            .select_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = "running"
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "started_at"])
+    return job
+
+
+def run_job(job, station_id=None):
+    """
+    Train, evaluate and save the model of a claimed job
+
+    Args:
+        job (TrainingJob): A running job
+        station_id (str): Weather station, defaults to WEATHER_STATION_ID
+
+    Returns:
+        TrainingJob: The finished job
+    """
+    station_id = station_id or settings.WEATHER_STATION_ID
+    try:
+        api_key = os.environ.get("METEOFRANCE_API_KEY")
+        # Days DPClim cannot deliver stay missing: retried jobs must not
+        # order them again on every scheduler tick
+        if (
+            api_key
+            and climatology_cache.missing_orders(station_id, 365)
+            and cache.add(f"training_jobs:sync:{station_id}", 1, settings.TRAINING_JOB_SYNC_INTERVAL_SECONDS)
+        ):
+            climatology_cache.sync(station_id, 365, api_key)
+        data = climatology_cache.get(station_id, days_back=365)
+        if data is None or data.empty:
+            raise ValueError("No climatology data available for training")
+
+        job.metrics = train_model(data, job.feature, job.days, settings.WEATHER_MODEL_DIR)
+        job.status = "succeeded"
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "metrics", "error", "finished_at"])
+    return job
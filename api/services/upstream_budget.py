@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import UpstreamBudget
+
+# Priority classes: scheduled ingestion may spend the whole bucket, calls
+# made on behalf of an API request leave UPSTREAM_PROXY_RESERVE_RATIO of it
+INGESTION = "ingestion"
+PROXY = "proxy"
+
+
+class BudgetExceeded(Exception):
+    """
+    No upstream call available for this API key within the allowed wait
+    """
+
+    def __init__(self, api, retry_after):
+        super().__init__(f"{api} rate limit budget exhausted, retry in {retry_after:.0f}s")
+        self.api = api
+        self.retry_after = retry_after
+
+
+def key_id(api_key):
+    """
+    Identify an API key without storing it
+    """
+    return hashlib.sha1((api_key or "").encode()).hexdigest()[:12]
+
+
+def bucket_limits(api):
+    """
+    Size of the token bucket of an API
+
+    Returns:
+        tuple: (capacity in calls, refill rate in calls per second, tokens kept for ingestion)
+    """
+    rate_per_minute = settings.UPSTREAM_RATE_LIMITS[api]
+    capacity = float(rate_per_minute)
+    return capacity, rate_per_minute / 60, capacity * settings.UPSTREAM_PROXY_RESERVE_RATIO
+
+
+def try_acquire(api, api_key, priority=PROXY):
+    """
+    Take one call from the bucket of an API key
+
+    The bucket row is locked for the update, so every web and scheduler
+    process draws from the same budget.
+
+    Args:
+        api (str): Upstream API, key of UPSTREAM_RATE_LIMITS
+        api_key (str): API key the call is made with
+        priority (str): INGESTION or PROXY
+
+    Returns:
+        float: 0 when the call is granted, otherwise seconds until it would be
+    """
+    capacity, refill, reserve = bucket_limits(api)
+    floor = reserve if priority == PROXY else 0.0
+    now = timezone.now()
+    with transaction.atomic():
+        bucket, _ = UpstreamBudget.objects.select_for_update().get_or_create(
+            api=api, key_id=key_id(api_key), defaults={"tokens": capacity, "updated_at": now}
+        )
+        elapsed = max(0.0, (now - bucket.updated_at).total_seconds())
+        tokens = min(capacity, bucket.tokens + elapsed * refill)
+        if tokens - 1 >= floor:
+            tokens -= 1
+            bucket.granted += 1
+            wait = 0.0
+        else:
+            bucket.throttled += 1
+            wait = (floor + 1 - tokens) / refill
+        bucket.tokens = tokens
+        bucket.updated_at = now
+        bucket.save(update_fields=["tokens", "updated_at", "granted", "throttled"])
+    return wait
+
+
+def max_wait(priority):
+    if priority == INGESTION:
+        return settings.UPSTREAM_INGESTION_MAX_WAIT_SECONDS
+    return settings.UPSTREAM_PROXY_MAX_WAIT_SECONDS
+
+
+def acquire(api, api_key, priority=PROXY):
+    """
+    Wait for one call of an API key's budget
+
+    Ingestion waits for the bucket to refill, requests only briefly: a
+    throttled request is answered from the cache or with a Retry-After
+    instead of spending the budget until upstream answers 429.
+
+    Raises:
+        BudgetExceeded: When no call is available within the priority's wait
+    """
+    deadline = time.monotonic() + max_wait(priority)
+    while True:
+        wait = try_acquire(api, api_key, priority)
+        if not wait:
+            return
+        if time.monotonic() + wait > deadline:
+            raise BudgetExceeded(api, wait)
+        time.sleep(wait)
+
+
+async def acquire_async(api, api_key, priority=INGESTION):
+    """
+    Same as acquire, waiting on the event loop
+    """
+    deadline = time.monotonic() + max_wait(priority)
+    while True:
+        wait = await sync_to_async(try_acquire)(api, api_key, priority)
+        if not wait:
+            return
+        if time.monotonic() + wait > deadline:
+            raise BudgetExceeded(api, wait)
+        await asyncio.sleep(wait)
+
+
+def budget_status():
+    """
+    Remaining budget of every upstream API key
+
+    Returns:
+        dict: Limits of each API and, per key seen so far, the tokens left
+            now and the granted / throttled call counters
+    """
+    now = timezone.now()
+    buckets = {}
+    for bucket in UpstreamBudget.objects.order_by("api", "key_id"):
+        buckets.setdefault(bucket.api, []).append(bucket)
+
+    status = {}
+    for api, rate_per_minute in settings.UPSTREAM_RATE_LIMITS.items():
+        capacity, refill, reserve = bucket_limits(api)
+        status[api] = {
+            "rate_per_minute": rate_per_minute,
+            "capacity": capacity,
+            "ingestion_reserve": reserve,
+            "keys": [
+                {
+                    "key_id": bucket.key_id,
+                    "tokens": round(min(capacity, bucket.tokens + max(0.0, (now - bucket.updated_at).total_seconds()) * refill), 2),
+                    "granted": bucket.granted,
+                    "throttled": bucket.throttled,
+                    "updated_at": bucket.updated_at,
+                }
+                for bucket in buckets.get(api, [])
+            ],
+        }
+    return status
@@ -1,135 +1,52 @@
-import os
-import requests
-import pandas as pd
 from datetime import datetime, timedelta
-from api.models_ai.weather.weather_prediction_model import WeatherPredictionModel
+from django.conf import settings
+from api.models_ai.weather.registry import weather_model_registry
+from api.models_ai.weather import features as weather_features
+from api.services import training_jobs
+from api.services.climatology import climatology_cache
 
+FEATURE_NAMES = {
+    "TX": "Maximum Temperature",
+    "TN": "Minimum Temperature",
+    "RR": "Precipitation",
+    "TM": "Average Temperature",
+    "TAMPLI": "Temperature Amplitude",
+}
+WEATHER_FEATURES = list(FEATURE_NAMES)
+MAX_DAYS_AHEAD = 7
 
-class MeteoFranceAPI:
-    """
-    A class to interact with the Météo France API for climatological data
-    """
-
-    def __init__(self, api_key):
-        """
-        Initialize with your API credentials
-
-        Args:
-            api_key (str): Your Météo France API key
-        """
-        self.api_key = api_key
-        self.base_url = "https://public-api.meteofrance.fr/public/DPClim/v1"
-        self.headers = {
-            "apikey": f"{self.api_key}",
-            "Content-Type": "application/json",
-        }
-
-    def create_data_order(
-        self, station_id, start_date, end_date, frequency="quotidienne"
-    ):
-        """
-        Create an order for climate data
-
-        Args:
-            station_id (str): ID of the weather station
-            start_date (str): Start date in ISO 8601 format
-            end_date (str): End date in ISO 8601 format
-            frequency (str): Data frequency - "quotidienne", "horaire", or "infrahoraire-6m"
-
-        Returns:
-            str: Order ID if successful, None otherwise
-        """
-        url = f"{self.base_url}/commande-station/{frequency}?id-station={station_id}&date-deb-periode={start_date}&date-fin-periode={end_date}"
-        payload = {}
-        response = requests.get(url, headers=self.headers, json=payload)
-
-        if response.status_code == 202:
-            try:
-                order_id = response.json()["elaboreProduitAvecDemandeResponse"][
-                    "return"
-                ]
-                return order_id
-            except KeyError:
-                print(f"Unexpected response format: {response.text}")
-                return None
-        else:
-            print(f"Error {response.status_code}: {response.text}")
-            return None
-
-    def download_data(self, order_id, max_retries=5, retry_delay=10):
-        """
-        Download ordered climate data
-
-        Args:
-            order_id (str): Order ID from create_data_order
-            max_retries (int): Maximum number of retries
-            retry_delay (int): Delay in seconds between retries
-
-        Returns:
-            str: Data as string if successful, None otherwise
-        """
-        url = f"{self.base_url}/commande/fichier?id-cmde={order_id}"
-
-        for attempt in range(max_retries):
-            response = requests.get(url, headers=self.headers)
-
-            if response.status_code == 201:  # Data is ready
-                return response.content.decode("utf-8")
-            elif response.status_code == 204:  # Still processing
-                print(
-                    f"Order {order_id} is still processing. Retry {attempt+1}/{max_retries}"
-                )
-                import time
-
-                time.sleep(retry_delay)
-            else:
-                print(f"Error {response.status_code}: {response.text}")
-                return None
-
-        print(f"Max retries reached for order {order_id}")
-        return None
-
-    def get_recent_data(self, station_id, days_back=30):
-        """
-        Get recent weather data for a station
-
-        Args:
-            station_id (str): ID of the weather station
-            days_back (int): Number of days back to fetch data
 
-        Returns:
-            pd.DataFrame: Recent weather data
-        """
-        end_date = datetime.now() - timedelta(
-            days=2
-        )  # 2 days ago to ensure data availability
-        start_date = end_date - timedelta(days=days_back)
-
-        start_date_str = start_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-        end_date_str = end_date.strftime("%Y-%m-%dT%H:%M:%SZ")
-
-        print(f"Fetching recent data from {start_date_str} to {end_date_str}")
-
-        # Create order
-        order_id = self.create_data_order(station_id, start_date_str, end_date_str)
+def feature_unit(feature):
+    return "°C" if feature in ["TX", "TN", "TM", "TAMPLI"] else "mm"
 
-        if order_id:
-            # Download data
-            data_str = self.download_data(order_id)
 
-            if data_str:
-                # Convert to DataFrame
-                from io import StringIO
+def prediction_date(days_to_predict):
+    return (datetime.now() + timedelta(days=days_to_predict)).strftime("%Y-%m-%d")
 
-                df = pd.read_csv(StringIO(data_str), sep=";")
 
-                # Convert date column to datetime
-                if "DATE" in df.columns:
-                    df["DATE"] = pd.to_datetime(df["DATE"])
-
-                return df
+def parse_horizons(value):
+    """
+    Parse a list of horizons: "1-7", "1,3,5" or "2"
 
-        return None
+    Returns:
+        list: Sorted days ahead
+    """
+    error = f"Days must be between 1 and {MAX_DAYS_AHEAD}"
+    horizons = set()
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        start = int(start)
+        end = int(end) if end else start
+        # Bounds are checked before expanding, "1-99999999999" must not build a huge range
+        if start < 1 or end > MAX_DAYS_AHEAD or end < start:
+            raise ValueError(error)
+        horizons.update(range(start, end + 1))
+    if not horizons:
+        raise ValueError(error)
+    return sorted(horizons)
 
 
 class WeatherPredictionService:
@@ -137,7 +54,7 @@ class WeatherPredictionService:
     Service to integrate weather data fetching with prediction model
     """
 
-    def __init__(self, api_key, station_id="69123002"):
+    def __init__(self, api_key, station_id=settings.WEATHER_STATION_ID):
         """
         Initialize the weather prediction service
 
@@ -147,35 +64,57 @@ class WeatherPredictionService:
         """
         self.api_key = api_key
         self.station_id = station_id
-        self.meteo_api = MeteoFranceAPI(api_key)
         self.model = None
 
-    def get_or_create_model(self, target_feature="TX", days_to_predict=1):
+    def get_model(self, target_feature="TX", days_to_predict=1):
         """
-        Get existing model or create/train a new one
+        Get the trained model, queueing its training if it does not exist
 
         Args:
             target_feature (str): Feature to predict
             days_to_predict (int): Number of days ahead to predict
 
         Returns:
-            WeatherPredictionModel: The prediction model
+            tuple: (WeatherPredictionModel, None) when the model exists,
+                (None, TrainingJob) when it is being trained
+        """
+        # Loaded models are shared by every request of the process
+        model = weather_model_registry.get(target_feature, days_to_predict)
+        if model is not None:
+            return model, None
+        return None, training_jobs.enqueue(target_feature, days_to_predict)
+
+    def get_recent_data(self):
+        """
+        Get recent weather data from the daily climatology store
+
+        Returns:
+            pd.DataFrame: Last 30 days of weather data
         """
-        model_path = f"api/models_ai/weather/saved_models"
+        recent_data = climatology_cache.get(self.station_id, days_back=30)
 
-        # Try to load existing model
-        model = WeatherPredictionModel(
-            target_feature=target_feature, days_to_predict=days_to_predict
-        )
+        if recent_data is None or recent_data.empty:
+            raise ValueError(
+                "Climatology data not available yet, it is synced daily by the scheduler"
+            )
+        return recent_data
+
+    def get_feature_row(self, fill_values=None):
+        """
+        Build the inference feature row from the cached float32 tail
 
-        if model.load_model(model_path):
-            print("Loaded existing model")
-            return model
+        Args:
+            fill_values (dict): Training medians of the model, used for missing values
 
-        # If no existing model, we need to train one
-        # For now, we'll return a model that needs to be trained
-        print("No existing model found. Model needs to be trained.")
-        return model
+        Returns:
+            FeatureRow: Features of the last stored day
+        """
+        tail = climatology_cache.tail(self.station_id)
+        if tail is None:
+            raise ValueError(
+                f"At least {weather_features.TAIL_DAYS} days of climatology are needed for prediction"
+            )
+        return weather_features.build_row(tail, fill_values)
 
     def predict_weather(self, target_feature="TX", days_to_predict=1):
         """
@@ -189,26 +128,23 @@ class WeatherPredictionService:
             dict: Prediction result with confidence metrics
         """
         try:
-            # Get recent weather data
-            recent_data = self.meteo_api.get_recent_data(self.station_id, days_back=30)
-
-            if recent_data is None or recent_data.empty:
-                raise ValueError("Failed to fetch recent weather data")
-
-            # Get or create model
-            model = self.get_or_create_model(target_feature, days_to_predict)
+            recent_data = self.get_recent_data()
 
-            if model.model is None:
-                # Train model with recent data if no pre-trained model exists
-                model.load_data_from_dataframe(recent_data)
-                model.build_model()
+            # Get model, training happens in the background if it is missing
+            model, job = self.get_model(target_feature, days_to_predict)
 
-                # Save the model for future use
-                model_path = f"api/models_ai/weather/saved_models"
-                model.save_model(model_path)
+            if job is not None:
+                return {
+                    "success": False,
+                    "error": "Model not trained yet, a training job is in progress",
+                    "job_id": job.id,
+                    "job_status": job.status,
+                    "prediction": None,
+                    "context": None,
+                }
 
             # Make prediction
-            prediction = model.make_prediction(recent_data)
+            prediction = model.predict_from_row(self.get_feature_row(model.fill_values))
 
             if prediction is None:
                 raise ValueError("Failed to make prediction")
@@ -216,27 +152,14 @@ class WeatherPredictionService:
             # Get latest actual data for context
             latest_data = recent_data.iloc[-1].to_dict()
 
-            # Determine prediction type
-            feature_names = {
-                "TX": "Maximum Temperature",
-                "TN": "Minimum Temperature",
-                "RR": "Precipitation",
-                "TM": "Average Temperature",
-                "TAMPLI": "Temperature Amplitude",
-            }
-
             return {
                 "success": True,
                 "prediction": {
                     "value": round(prediction, 2),
-                    "unit": (
-                        "°C" if target_feature in ["TX", "TN", "TM", "TAMPLI"] else "mm"
-                    ),
-                    "feature": feature_names.get(target_feature, target_feature),
+                    "unit": feature_unit(target_feature),
+                    "feature": FEATURE_NAMES.get(target_feature, target_feature),
                     "days_ahead": days_to_predict,
-                    "prediction_date": (
-                        datetime.now() + timedelta(days=days_to_predict)
-                    ).strftime("%Y-%m-%d"),
+                    "prediction_date": prediction_date(days_to_predict),
                 },
                 "context": {
                     "latest_data": latest_data,
@@ -256,6 +179,63 @@ class WeatherPredictionService:
                 "context": None,
             }
 
+    def predict_grid(self, features=None, horizons=None):
+        """
+        Predict several features over several horizons in one pass
+
+        The climatology is read once and the feature row is built once per
+        set of training medians; models trained together share the same row.
+
+        Args:
+            features (list): Features to predict, defaults to all of them
+            horizons (list): Days ahead to predict, defaults to 1 to 7
+
+        Returns:
+            dict: feature x horizon grid of predictions
+        """
+        features = features or WEATHER_FEATURES
+        horizons = horizons or list(range(1, MAX_DAYS_AHEAD + 1))
+        try:
+            recent_data = self.get_recent_data()
+            rows = {}
+
+            grid = {}
+            pending_jobs = []
+            for feature in features:
+                grid[feature] = {}
+                for days in horizons:
+                    model, job = self.get_model(feature, days)
+                    if job is not None:
+                        pending_jobs.append(job.id)
+                        cell = {"value": None, "job_id": job.id, "job_status": job.status}
+                    else:
+                        fill_key = tuple(sorted((model.fill_values or {}).items()))
+                        if fill_key not in rows:
+                            rows[fill_key] = self.get_feature_row(model.fill_values)
+                        value = model.predict_from_row(rows[fill_key])
+                        cell = {"value": None if value is None else round(value, 2)}
+                    cell["prediction_date"] = prediction_date(days)
+                    grid[feature][str(days)] = cell
+
+            return {
+                "success": True,
+                "grid": grid,
+                "units": {feature: feature_unit(feature) for feature in features},
+                "pending_jobs": pending_jobs,
+                "context": {
+                    "latest_data": recent_data.iloc[-1].to_dict(),
+                    "station_id": self.station_id,
+                },
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "grid": None,
+                "context": None,
+            }
+
     def get_multiple_predictions(self, features=["TX", "TN", "RR"], days_to_predict=1):
         """
         Get predictions for multiple weather features
@@ -267,16 +247,35 @@ class WeatherPredictionService:
         Returns:
             dict: Multiple prediction results
         """
+        result = self.predict_grid(features, [days_to_predict])
         results = {}
 
         for feature in features:
-            results[feature] = self.predict_weather(feature, days_to_predict)
+            if not result["success"]:
+                results[feature] = {"success": False, "error": result["error"], "prediction": None}
+                continue
+            cell = result["grid"][feature][str(days_to_predict)]
+            if cell["value"] is None:
+                results[feature] = {
+                    "success": False,
+                    "error": "Model not trained yet" if "job_id" in cell else "Failed to make prediction",
+                    "prediction": None,
+                }
+                continue
+            results[feature] = {
+                "success": True,
+                "prediction": {
+                    "value": cell["value"],
+                    "unit": feature_unit(feature),
+                    "feature": FEATURE_NAMES.get(feature, feature),
+                    "days_ahead": days_to_predict,
+                    "prediction_date": cell["prediction_date"],
+                },
+            }
 
         return {
             "success": True,
             "predictions": results,
-            "prediction_date": (
-                datetime.now() + timedelta(days=days_to_predict)
-            ).strftime("%Y-%m-%d"),
+            "prediction_date": prediction_date(days_to_predict),
             "days_ahead": days_to_predict,
         }
@@ -0,0 +1,22 @@
+from django.dispatch import Signal, receiver
+
+# Sent by ingestion jobs once new AirQualityMeasurement rows are stored.
+# Receivers get the freshly inserted rows in the ``measurements`` kwarg.
+measurements_ingested = Signal()
+
+
+@receiver(measurements_ingested)
+def evaluate_alerts_on_ingest(sender, measurements, **kwargs):
+    from api.services.alert_service import evaluate_measurements
+    from api.services.event_broker import notify
+
+    result = evaluate_measurements(measurements)
+    notify("alerte", [a.id for alerts in result.values() for a in alerts])
+    return result
+
+
+@receiver(measurements_ingested)
+def publish_measurements_on_ingest(sender, measurements, **kwargs):
+    from api.services.event_broker import notify
+
+    notify("measurement", [m.id for m in measurements])
@@ -1,3 +1,670 @@
-from django.test import TestCase
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api.models import AirQualityMeasurement, Alerte
+from api.models_ai.weather import features
+from api.models_ai.weather.backtest import walk_forward_folds
+from api.models_ai.weather.weather_prediction_model import WeatherPredictionModel
+from api.services import circuit_breaker
+from api.services.alert_service import breach_masks, is_tracked, plan_episodes
+from api.services.circuit_breaker import CircuitOpen
+from api.services.event_broker import EventBroker
+from api.services.threshold_backtest import replay
+from api.services.threshold_cache import ThresholdArray
+from api.services.upstream_budget import INGESTION, PROXY, BudgetExceeded, acquire, try_acquire
+from api.services.weather_service import MAX_DAYS_AHEAD, parse_horizons
+from api.utils import upstream
+from api.utils.startup_profile import profile_imports
+
+
+def pandas_features(df):
+    """
+    Reference pandas implementation of the weather features
+    """
+    df = df.copy()
+    for i in features.LAGS:
+        for col in features.LAG_COLUMNS:
+            if col in df.columns:
+                df[f"{col}_lag_{i}"] = df[col].shift(i)
+    for window in features.ROLLING_WINDOWS:
+        for col in features.LAG_COLUMNS:
+            if col in df.columns:
+                df[f"{col}_rolling_{window}"] = df[col].rolling(window=window).mean()
+    df["dayofyear"] = df.index.dayofyear
+    df["month"] = df.index.month
+    return df
+
+
+class WeatherFeaturesTest(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        dates = pd.date_range("2024-11-20", periods=90, freq="D", name="DATE")
+        self.df = pd.DataFrame(
+            {
+                "RR": rng.gamma(0.5, 4.0, len(dates)),
+                "TN": rng.normal(5, 3, len(dates)),
+                "TM": rng.normal(10, 3, len(dates)),
+                "TX": rng.normal(15, 4, len(dates)),
+                "TAMPLI": rng.normal(9, 2, len(dates)),
+            },
+            index=dates,
+        )
+
+    def test_matrix_matches_pandas(self):
+        values, columns, dates = features.frame_to_arrays(self.df)
+        matrix = features.build_matrix(values, columns, dates)
+        expected = pandas_features(self.df)
+
+        self.assertEqual(features.feature_names(columns), expected.columns.tolist())
+        np.testing.assert_allclose(matrix, expected.to_numpy(dtype=float), equal_nan=True)
+
+    def test_last_row_matches_matrix(self):
+        values, columns, dates = features.frame_to_arrays(self.df)
+        matrix = features.build_matrix(values, columns, dates)
+        tail = values[-features.TAIL_DAYS:]
+
+        row = features.build_last_row(tail, columns, dates[-1])
+        np.testing.assert_allclose(row, matrix[-1])
+
+    def test_inference_row_selects_model_features(self):
+        frame = self.df.reset_index()
+        frame["FFM"] = 3.0
+        row = features.build_inference_row(frame)
+        names = features.feature_names(list(self.df.columns))
+
+        expected = pandas_features(self.df).iloc[-1][names].to_numpy(dtype=float)
+        np.testing.assert_allclose(row.select(names)[0], expected)
+
+    def test_saved_model_feature_order(self):
+        path = os.path.join(
+            os.path.dirname(features.__file__), "saved_models", "features_TX_3day.txt"
+        )
+        with open(path) as f:
+            saved = f.read().splitlines()
+        self.assertEqual(features.feature_names(["RR", "TN", "TM", "TX", "TAMPLI"]), saved)
+
+    def test_float32_tail_matches_matrix(self):
+        values, columns, dates = features.frame_to_arrays(self.df)
+        matrix = features.build_matrix(values, columns, dates)
+
+        tail = features.prepare_tail(self.df)
+        row = features.build_row(tail)
+        self.assertEqual(row.values.dtype, np.float32)
+        self.assertEqual(row.names, features.feature_names(columns))
+        np.testing.assert_allclose(row.values, matrix[-1], rtol=1e-5)
+
+    def test_missing_values_match_training(self):
+        # Missing observations inside the inference window and elsewhere
+        raw = self.df.copy()
+        raw.iloc[-3, raw.columns.get_loc("TX")] = np.nan
+        raw.iloc[-10, raw.columns.get_loc("RR")] = np.nan
+        raw.iloc[5, raw.columns.get_loc("TN")] = np.nan
+
+        model = WeatherPredictionModel(target_feature="TX", days_to_predict=1)
+        trained = model.load_data_from_dataframe(raw.copy())
+        self.assertEqual(model.fill_values["TX"], float(raw["TX"].median()))
+
+        values, columns, dates = features.frame_to_arrays(trained)
+        matrix = features.build_matrix(values, columns, dates)
+        row = features.build_row(features.prepare_tail(raw), model.fill_values)
+        names = features.feature_names(columns)
+        np.testing.assert_allclose(row.select(names)[0], matrix[-1], rtol=1e-5)
+
+    def test_short_tail_is_rejected(self):
+        values, columns, dates = features.frame_to_arrays(self.df.tail(5))
+        with self.assertRaises(ValueError):
+            features.build_last_row(values, columns, dates[-1])
+
+
+class ParseHorizonsTest(SimpleTestCase):
+    def test_ranges_and_lists(self):
+        self.assertEqual(parse_horizons("1-3,5"), [1, 2, 3, 5])
+        self.assertEqual(parse_horizons(f"1-{MAX_DAYS_AHEAD}"), list(range(1, MAX_DAYS_AHEAD + 1)))
+
+    def test_out_of_bounds_range_is_rejected_before_expansion(self):
+        for value in ["1-99999999999", "0-3", "5-2", "", "8"]:
+            with self.assertRaises(ValueError):
+                parse_horizons(value)
+
+
+class WalkForwardFoldsTest(SimpleTestCase):
+    def test_training_labels_precede_test_window(self):
+        # Row i is labelled with day i + horizon
+        for horizon in (1, 3, 7):
+            folds = walk_forward_folds(100, 30, 10, 10, horizon)
+            self.assertTrue(folds)
+            for train_end, test_start, test_end in folds:
+                self.assertEqual(train_end, test_start - horizon)
+                self.assertLess(train_end - 1 + horizon, test_start)
+                self.assertLessEqual(test_end, 100)
+
+
+def measurement(when, latitude=45.75, longitude=4.85, **values):
+    return AirQualityMeasurement(latitude=latitude, longitude=longitude, datetime_utc=when, **values)
+
+
+def replay_evaluator(series, thresholds, start):
+    """
+    Feed a series of values to the evaluator one measurement at a time
+
+    Episodes are kept in memory and filtered with is_tracked, as
+    load_episodes does in the database.
+
+    Args:
+        series (list): pm10 values, one per hour
+        thresholds (ThresholdArray): Thresholds to evaluate
+        start (datetime): Time of the first value
+
+    Returns:
+        list: Every episode, in creation order
+    """
+    episodes = []
+    for hour, value in enumerate(series):
+        now = start + timedelta(hours=hour)
+        tracked = {}
+        for episode in episodes:
+            if is_tracked(episode, now):
+                tracked[(episode.threshold_id, episode.latitude, episode.longitude)] = episode
+        result = plan_episodes([measurement(now, pm10=value)], thresholds, tracked, now)
+        episodes += result["opened"]
+    return episodes
+
+
+@override_settings(ALERT_HYSTERESIS_RATIO=0.1, ALERT_COOLDOWN_MINUTES=60)
+class AlertEpisodesTest(SimpleTestCase):
+    def setUp(self):
+        self.now = datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+        self.thresholds = ThresholdArray([1], ["pm10"], [50.0])
+
+    def episode(self, status="open", closed_at=None, threshold_id=1, latitude=45.75):
+        return Alerte(
+            created_at=self.now - timedelta(hours=3),
+            triggered_by="auto",
+            threshold_id=threshold_id,
+            latitude=latitude,
+            longitude=4.85,
+            value=60.0,
+            peak_value=60.0,
+            occurrences=1,
+            status=status,
+            closed_at=closed_at,
+        )
+
+    def plan(self, value, episode=None, thresholds=None):
+        episodes = {(1, 45.75, 4.85): episode} if episode else {}
+        return plan_episodes(
+            [measurement(self.now, pm10=value)], thresholds or self.thresholds, episodes, self.now
+        )
+
+    def test_breach_opens_an_episode(self):
+        result = self.plan(55.0)
+        self.assertEqual(len(result["opened"]), 1)
+        self.assertEqual(result["opened"][0].status, "open")
+        self.assertEqual(self.plan(49.0)["opened"], [])
+
+    def test_value_inside_band_keeps_episode_open(self):
+        episode = self.episode()
+        result = self.plan(47.0, episode)
+        self.assertEqual(result["updated"], [episode])
+        self.assertEqual(result["closed"], [])
+        self.assertEqual(episode.status, "open")
+        self.assertEqual(episode.occurrences, 1)
+
+    def test_value_below_band_closes_episode(self):
+        episode = self.episode()
+        result = self.plan(44.0, episode)
+        self.assertEqual(result["closed"], [episode])
+        self.assertEqual(episode.status, "closed")
+        self.assertEqual(episode.closed_at, self.now)
+
+    def test_breach_within_cooldown_reopens_episode(self):
+        episode = self.episode(status="closed", closed_at=self.now - timedelta(minutes=30))
+        self.assertTrue(is_tracked(episode, self.now))
+        result = self.plan(70.0, episode)
+        self.assertEqual(result["updated"], [episode])
+        self.assertEqual(episode.status, "open")
+        self.assertIsNone(episode.closed_at)
+        self.assertEqual(episode.peak_value, 70.0)
+        self.assertEqual(episode.occurrences, 2)
+
+    def test_episode_after_cooldown_is_not_tracked(self):
+        episode = self.episode(status="closed", closed_at=self.now - timedelta(minutes=90))
+        self.assertFalse(is_tracked(episode, self.now))
+
+    def test_zero_threshold_episode_can_close(self):
+        thresholds = ThresholdArray([1], ["pm10"], [0.0])
+        self.assertEqual(self.plan(0.0, thresholds=thresholds)["opened"], [])
+        self.assertEqual(len(self.plan(0.5, thresholds=thresholds)["opened"]), 1)
+        episode = self.episode()
+        result = self.plan(0.0, episode, thresholds)
+        self.assertEqual(result["closed"], [episode])
+
+    def test_no_band_never_both_above_and_below(self):
+        values = np.array([[-2.0, -1.0, 0.0, 0.5, 1.0]]).T
+        above, below = breach_masks(values, np.array([-1.0, 0.0, 1.0]), 0.1)
+        self.assertFalse((above & below).any())
+
+    def test_bulk_counts(self):
+        # Two locations x two thresholds in one evaluation
+        thresholds = ThresholdArray([1, 2], ["pm10", "no2"], [50.0, 40.0])
+        locations = [
+            measurement(self.now, latitude=45.75, pm10=60.0, no2=10.0),
+            measurement(self.now, latitude=45.80, pm10=30.0, no2=45.0),
+        ]
+        open_episode = self.episode(threshold_id=1, latitude=45.75)
+        closing_episode = self.episode(threshold_id=1, latitude=45.80)
+        episodes = {
+            (1, 45.75, 4.85): open_episode,
+            (1, 45.80, 4.85): closing_episode,
+        }
+        result = plan_episodes(locations, thresholds, episodes, self.now)
+        self.assertEqual(len(result["opened"]), 1)
+        self.assertEqual(result["opened"][0].threshold_id, 2)
+        self.assertEqual(result["updated"], [open_episode])
+        self.assertEqual(result["closed"], [closing_episode])
+
+
+@override_settings(ALERT_HYSTERESIS_RATIO=0.1, ALERT_COOLDOWN_MINUTES=60)
+class ThresholdBacktestParityTest(SimpleTestCase):
+    # Hourly pm10: breach, value inside the band, close, re-breach one hour
+    # after closing (within the cooldown), close, re-breach three hours
+    # after closing (after the cooldown), close
+    SERIES = [40, 55, 47, 44, 52, 40, 42, 43, 60, 30, 41]
+
+    def test_backtest_matches_evaluator(self):
+        start = datetime(2025, 3, 1, 0, tzinfo=timezone.utc)
+        times = np.array(
+            [(start + timedelta(hours=h)).replace(tzinfo=None) for h in range(len(self.SERIES))],
+            dtype="datetime64[s]",
+        )
+        values = np.asarray(self.SERIES, dtype=np.float64)
+        cooldown = np.timedelta64(settings.ALERT_COOLDOWN_MINUTES * 60, "s")
+
+        for threshold in (45.0, 50.0, 58.0, 0.0):
+            with self.subTest(threshold=threshold):
+                live = replay_evaluator(self.SERIES, ThresholdArray([1], ["pm10"], [threshold]), start)
+                expected = [
+                    {
+                        "start": e.created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                        "end": e.closed_at.strftime("%Y-%m-%dT%H:%M:%SZ") if e.closed_at else None,
+                        "peak": e.peak_value,
+                    }
+                    for e in live
+                ]
+                result = replay("pm10", times, values, np.array([threshold]), 0.1, cooldown)[0]
+                self.assertEqual(result["episodes"], expected)
+                self.assertEqual(result["episode_count"], len(live))
+
+    def test_series_covers_cooldown_cases(self):
+        start = datetime(2025, 3, 1, 0, tzinfo=timezone.utc)
+        live = replay_evaluator(self.SERIES, ThresholdArray([1], ["pm10"], [50.0]), start)
+        # The re-breach within the cooldown reopened the first episode, the
+        # one after the cooldown opened a second one
+        self.assertEqual(
+            [(e.created_at.hour, e.closed_at.hour, e.occurrences) for e in live],
+            [(1, 5, 2), (8, 9, 1)],
+        )
+
+
+class StartupBudgetTest(SimpleTestCase):
+    def test_urlconf_import_within_budget(self):
+        profile = profile_imports("smart_city.urls")
+
+        self.assertEqual(profile["heavy"], [], "ML libraries must be imported lazily")
+        self.assertLess(profile["seconds"], settings.STARTUP_IMPORT_BUDGET_SECONDS)
+        self.assertLess(profile["rss_mb"], settings.STARTUP_RSS_BUDGET_MB)
+
+
+# Breaker state and cached responses live in the Django cache: tests use a
+# local memory cache instead of the database one
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "api-tests"}
+}
+
+
+@override_settings(UPSTREAM_RATE_LIMITS={"owm": 60}, UPSTREAM_PROXY_RESERVE_RATIO=0.25)
+class UpstreamBudgetTest(TestCase):
+    # 60 calls per minute: a bucket of 60 tokens refilled at one per second,
+    # 15 of them kept for ingestion
+    def setUp(self):
+        self.now = datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+        patcher = mock.patch("api.services.upstream_budget.timezone.now", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def drain(self, priority, api_key="key"):
+        granted = 0
+        while not try_acquire("owm", api_key, priority):
+            granted += 1
+        return granted
+
+    def test_proxy_leaves_the_ingestion_reserve(self):
+        self.assertEqual(self.drain(PROXY), 45)
+        self.assertEqual(self.drain(INGESTION), 15)
+
+    def test_wait_until_refilled(self):
+        self.drain(PROXY)
+        self.assertAlmostEqual(try_acquire("owm", "key", PROXY), 1.0)
+
+        self.now += timedelta(seconds=1)
+        self.assertEqual(try_acquire("owm", "key", PROXY), 0)
+        self.assertAlmostEqual(try_acquire("owm", "key", PROXY), 1.0)
+
+    def test_refill_is_capped_at_capacity(self):
+        self.drain(INGESTION)
+        self.now += timedelta(hours=1)
+        self.assertEqual(self.drain(INGESTION), 60)
+
+    def test_keys_have_their_own_bucket(self):
+        self.drain(INGESTION, "first")
+        self.assertEqual(try_acquire("owm", "second", PROXY), 0)
+
+    @override_settings(UPSTREAM_PROXY_MAX_WAIT_SECONDS=0.5)
+    def test_proxy_does_not_wait_past_its_budget(self):
+        self.drain(PROXY)
+        with self.assertRaises(BudgetExceeded) as raised:
+            acquire("owm", "key", PROXY)
+        self.assertAlmostEqual(raised.exception.retry_after, 1.0)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    UPSTREAM_RATE_LIMITS={"owm": 60},
+    UPSTREAM_BREAKER_FAILURES=3,
+    UPSTREAM_BREAKER_COOLDOWN_SECONDS=30,
+    UPSTREAM_BREAKER_PROBE_SECONDS=15,
+)
+class CircuitBreakerTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1_000_000.0
+        clock = mock.patch("api.services.circuit_breaker.time")
+        clock.start().time.side_effect = lambda: self.now
+        self.addCleanup(clock.stop)
+
+    def fail(self, times, probe=False):
+        for _ in range(times):
+            circuit_breaker.record("owm", False, probe)
+
+    def state(self):
+        return circuit_breaker.breaker_status()["owm"]
+
+    def open_breaker(self):
+        self.fail(3)
+        self.now += 30
+
+    def test_consecutive_failures_open_the_breaker(self):
+        self.fail(2)
+        self.assertFalse(circuit_breaker.allow("owm"))
+        self.assertEqual(self.state(), {"state": "closed", "failures": 2})
+
+        self.fail(1)
+        with self.assertRaises(CircuitOpen) as raised:
+            circuit_breaker.allow("owm")
+        self.assertEqual(raised.exception.retry_after, 30)
+        self.assertEqual(self.state(), {"state": "open", "failures": 3})
+
+    def test_success_resets_the_failure_count(self):
+        self.fail(2)
+        circuit_breaker.record("owm", True)
+        self.fail(2)
+        self.assertFalse(circuit_breaker.allow("owm"))
+
+    def test_single_probe_after_cooldown(self):
+        self.open_breaker()
+        self.assertEqual(self.state()["state"], "half_open")
+        self.assertTrue(circuit_breaker.allow("owm"))
+        with self.assertRaises(CircuitOpen):
+            circuit_breaker.allow("owm")
+
+    def test_successful_probe_closes_the_breaker(self):
+        self.open_breaker()
+        circuit_breaker.record("owm", True, circuit_breaker.allow("owm"))
+        self.assertEqual(self.state(), {"state": "closed", "failures": 0})
+        self.assertFalse(circuit_breaker.allow("owm"))
+
+    def test_failed_probe_reopens_the_breaker(self):
+        self.open_breaker()
+        self.fail(1, probe=circuit_breaker.allow("owm"))
+        with self.assertRaises(CircuitOpen) as raised:
+            circuit_breaker.allow("owm")
+        self.assertEqual(raised.exception.retry_after, 30)
+
+    def test_released_probe_can_be_taken_again(self):
+        self.open_breaker()
+        circuit_breaker.release("owm", circuit_breaker.allow("owm"))
+        self.assertTrue(circuit_breaker.allow("owm"))
+
+    @override_settings(UPSTREAM_LATENCY_SLO_SECONDS={"meteofrance": 5})
+    def test_failures(self):
+        self.assertTrue(circuit_breaker.is_failure("meteofrance", 429, 0.1))
+        self.assertTrue(circuit_breaker.is_failure("meteofrance", 503, 0.1))
+        self.assertTrue(circuit_breaker.is_failure("meteofrance", 200, 8))
+        self.assertFalse(circuit_breaker.is_failure("meteofrance", 404, 0.1))
+        # DPClim orders are slow by design and have their own SLO
+        self.assertFalse(circuit_breaker.is_failure("meteofrance", 200, 8, latency_slo=20))
+        self.assertTrue(circuit_breaker.is_failure("meteofrance", 503, 8, latency_slo=20))
+
+
+def response(status_code=200, body=b"{}"):
+    answer = requests.Response()
+    answer.status_code = status_code
+    answer._content = body
+    return answer
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    UPSTREAM_LATENCY_SLO_SECONDS={"owm": 2},
+    UPSTREAM_BREAKER_FAILURES=1,
+)
+class UpstreamGetTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        for name in ("acquire", "try_acquire"):
+            patcher = mock.patch(f"api.utils.upstream.{name}", return_value=0)
+            setattr(self, name, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def slow_then_fast(self, slow_delay=0.5, slow_error=None):
+        calls = []
+
+        def get(url, **kwargs):
+            calls.append(url)
+            if len(calls) == 1:
+                time.sleep(slow_delay)
+                if slow_error:
+                    raise slow_error
+                return response(body=b'"slow"')
+            return response(body=b'"fast"')
+
+        return calls, mock.patch("api.utils.upstream.requests.get", side_effect=get)
+
+    def test_hedge_answers_first(self):
+        calls, patcher = self.slow_then_fast()
+        with patcher:
+            answer = upstream.get(upstream.OWM, "https://owm.test", "key", hedge_after=0.05)
+        self.assertEqual(answer.json(), "fast")
+        self.assertEqual(len(calls), 2)
+        self.try_acquire.assert_called_once_with(upstream.OWM, "key", PROXY)
+
+    def test_hedge_recovers_a_failed_call(self):
+        calls, patcher = self.slow_then_fast(slow_delay=0.1, slow_error=requests.ConnectionError())
+        with patcher:
+            answer = upstream.get(upstream.OWM, "https://owm.test", "key", hedge_after=0.05)
+        self.assertEqual(answer.json(), "fast")
+
+    def test_no_hedge_without_spare_budget(self):
+        self.try_acquire.return_value = 5.0
+        calls, patcher = self.slow_then_fast(slow_delay=0.1)
+        with patcher:
+            answer = upstream.get(upstream.OWM, "https://owm.test", "key", hedge_after=0.05)
+        self.assertEqual(answer.json(), "slow")
+        self.assertEqual(len(calls), 1)
+
+    def test_no_hedge_for_fast_calls(self):
+        calls, patcher = self.slow_then_fast(slow_delay=0)
+        with patcher:
+            upstream.get(upstream.OWM, "https://owm.test", "key", hedge_after=0.5)
+        self.assertEqual(len(calls), 1)
+        self.try_acquire.assert_not_called()
+
+    def test_server_error_opens_the_breaker(self):
+        with mock.patch("api.utils.upstream.requests.get", return_value=response(503)):
+            upstream.get(upstream.OWM, "https://owm.test", "key")
+        with self.assertRaises(CircuitOpen):
+            upstream.get(upstream.OWM, "https://owm.test", "key")
+
+    def test_slow_call_within_its_own_slo(self):
+        def get(url, **kwargs):
+            time.sleep(0.05)
+            return response()
+
+        with mock.patch("api.utils.upstream.requests.get", side_effect=get):
+            upstream.get(upstream.OWM, "https://owm.test", "key", latency_slo=1)
+            self.assertEqual(circuit_breaker.breaker_status()["owm"]["state"], "closed")
+            upstream.get(upstream.OWM, "https://owm.test", "key", latency_slo=0.01)
+        self.assertEqual(circuit_breaker.breaker_status()["owm"]["state"], "open")
+
+    def test_exhausted_budget_releases_the_probe(self):
+        circuit_breaker.record(upstream.OWM, False)
+        with mock.patch("api.services.circuit_breaker.time") as clock:
+            clock.time.return_value = time.time() + 3600
+            self.acquire.side_effect = BudgetExceeded(upstream.OWM, 10)
+            with self.assertRaises(BudgetExceeded):
+                upstream.get(upstream.OWM, "https://owm.test", "key")
+            self.assertTrue(circuit_breaker.allow(upstream.OWM))
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    UPSTREAM_CACHE_TTLS={"fresh": 600, "stale": 0},
+    UPSTREAM_CACHE_STALE_SECONDS=600,
+    UPSTREAM_CACHE_LOCK_SECONDS=5,
+)
+class CachedFetchTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def fetch(self):
+        self.calls += 1
+        return {"call": self.calls}
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "background refresh did not finish")
+            time.sleep(0.01)
+
+    def test_fresh_entry_is_served_from_cache(self):
+        self.assertEqual(upstream.cached_fetch("fresh", {"q": 1}, self.fetch), ({"call": 1}, 0.0))
+        data, age = upstream.cached_fetch("fresh", {"q": 1}, self.fetch)
+        self.assertEqual(data, {"call": 1})
+        self.assertGreaterEqual(age, 0)
+        self.assertEqual(self.calls, 1)
+
+    def test_parameters_have_their_own_entry(self):
+        upstream.cached_fetch("fresh", {"q": 1}, self.fetch)
+        upstream.cached_fetch("fresh", {"q": 2}, self.fetch)
+        self.assertEqual(self.calls, 2)
+
+    def test_stale_entry_is_served_while_refreshed(self):
+        upstream.cached_fetch("stale", {"q": 1}, self.fetch)
+        data, _ = upstream.cached_fetch("stale", {"q": 1}, self.fetch)
+        self.assertEqual(data, {"call": 1})
+
+        key = upstream.cache_key("stale", {"q": 1})
+        self.wait_for(lambda: cache.get(key)["data"] == {"call": 2})
+        self.wait_for(lambda: cache.get(f"{key}:lock") is None)
+
+    def test_single_refresh_while_locked(self):
+        upstream.cached_fetch("stale", {"q": 1}, self.fetch)
+        key = upstream.cache_key("stale", {"q": 1})
+        cache.add(f"{key}:lock", 1, 5)
+
+        for _ in range(3):
+            upstream.cached_fetch("stale", {"q": 1}, self.fetch)
+        self.assertEqual(self.calls, 1)
+
+    def test_failed_refresh_keeps_the_stale_entry(self):
+        upstream.cached_fetch("stale", {"q": 1}, self.fetch)
+        key = upstream.cache_key("stale", {"q": 1})
+        failed = threading.Event()
+
+        def broken():
+            failed.set()
+            raise requests.ConnectionError("down")
+
+        data, _ = upstream.cached_fetch("stale", {"q": 1}, broken)
+        self.assertEqual(data, {"call": 1})
+        self.assertTrue(failed.wait(5))
+        self.wait_for(lambda: cache.get(f"{key}:lock") is None)
+        self.assertEqual(cache.get(key)["data"], {"call": 1})
+
+
+@override_settings(SSE_POLL_SECONDS=5, SSE_LISTEN_RETRY_SECONDS=0.01, SSE_LISTEN_RETRY_MAX_SECONDS=0.02)
+class EventBrokerFallbackTest(SimpleTestCase):
+    async def test_listen_is_retried_while_polling(self):
+        broker = EventBroker()
+        attempts = []
+        polls = []
+        listening = asyncio.Event()
+
+        def connect():
+            attempts.append(len(attempts))
+            if len(attempts) < 4:
+                raise OSError("connection refused")
+            return "conn"
+
+        async def listen(conn):
+            listening.set()
+            await asyncio.Event().wait()
+
+        async def poll():
+            polls.append("started")
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                polls.append("stopped")
+                raise
+
+        with (
+            mock.patch("api.services.event_broker.connection") as db,
+            mock.patch.object(broker, "_connect", side_effect=connect),
+            mock.patch.object(broker, "_listen", side_effect=listen),
+            mock.patch.object(broker, "_poll", side_effect=poll),
+            mock.patch.object(broker, "_catch_up") as catch_up,
+            self.assertLogs("api.services.event_broker", "INFO") as logs,
+        ):
+            db.vendor = "postgresql"
+            task = asyncio.create_task(broker._run())
+            await asyncio.wait_for(listening.wait(), 5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        self.assertEqual(len(attempts), 4)
+        # A single poller, stopped once LISTEN is back, then a catch-up poll
+        self.assertEqual(polls, ["started", "stopped"])
+        catch_up.assert_awaited_once()
+        self.assertEqual(
+            [record.getMessage() for record in logs.records],
+            [
+                "LISTEN unavailable, polling every 5s and retrying in 0.01s: connection refused",
+                "LISTEN unavailable, polling every 5s and retrying in 0.02s: connection refused",
+                "LISTEN unavailable, polling every 5s and retrying in 0.02s: connection refused",
+                "LISTEN restored, polling stopped",
+            ],
+        )
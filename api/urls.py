@@ -7,8 +7,10 @@ from api.views.alerte import AlerteView
 from api.views.auth import LoginView, CustomTokenRefreshView
 from api.views.air_quality import Last10HoursAQView, LastMonthAQView
 from api.views.predict_air_quality import AirQualityPredictView
+from api.views.stream import alert_stream
+from api.views.upstream import UpstreamBreakerView, UpstreamBudgetView
 from api.views.weather import CurrentWeatherView
-from api.views.weather_prediction import WeatherPredictionView
+from api.views.weather_prediction import WeatherPredictionView, WeatherGridPredictionView, TrainingJobView
 
 router = DefaultRouter()
 router.register(r'alerte', AlerteView, basename='alerte')
@@ -27,11 +29,18 @@ urlpatterns = [
     # Predict AI
     path('predict/air-quality/', AirQualityPredictView.as_view(), name='predict_air_quality'),
     path('predict/weather/', WeatherPredictionView.as_view(), name='predict_weather'),
+    path('predict/weather/grid/', WeatherGridPredictionView.as_view(), name='predict_weather_grid'),
+    path('predict/weather/jobs/<int:pk>/', TrainingJobView.as_view(), name='training_job'),
     # OpenWeatherMap
     path('aq/last-10h/', Last10HoursAQView.as_view(), name='last_10h_aq'),
     path('aq/last-month/', LastMonthAQView.as_view(), name='last_month_aq'),
     # Weather
     path('weather/', CurrentWeatherView.as_view(), name='current_weather' ),
+    # Upstream APIs
+    path('upstream/budget/', UpstreamBudgetView.as_view(), name='upstream_budget'),
+    path('upstream/breakers/', UpstreamBreakerView.as_view(), name='upstream_breakers'),
+    # Server-Sent Events (ASGI only)
+    path('alerte/stream/', alert_stream, name='alerte_stream'),
     # CRUD views
     path('', include(router.urls)),
 ]
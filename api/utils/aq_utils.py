@@ -1,8 +1,15 @@
 import os
 import time
-import requests
 import numpy as np
 
+from api.utils.upstream import OWM, cached_get
+
+# Air quality indicator codes, in the column order used by the feature
+# matrices. Codes match the RefIndicator seeds and the AirQualityMeasurement
+# field names.
+INDICATOR_CODES = ["aqi", "co", "no", "no2", "o3", "so2", "pm2_5", "pm10", "nh3"]
+INDICATOR_INDEX = {code: i for i, code in enumerate(INDICATOR_CODES)}
+
 def get_aq_matrix_10h() -> np.ndarray:
     data = get_last_10h_aq()
     matrix = []
@@ -48,7 +55,10 @@ def get_last_10h_aq():
         "appid": api_key
     }
 
-    r = requests.get(url, params=params)
-    r.raise_for_status()
-    data = r.json()["list"]
-    return data
\ No newline at end of file
+    # The window moves with every call: cache on the location only, the
+    # endpoint TTL bounding how old the last hour can be
+    data, _ = cached_get(
+        OWM, "owm_air_history", url, api_key, params,
+        key_params={"lat": params["lat"], "lon": params["lon"]},
+    )
+    return data["list"]
\ No newline at end of file
@@ -0,0 +1,63 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Modules that must never be imported when the URLconf loads
+HEAVY_MODULES = ("torch", "sklearn", "xgboost", "matplotlib", "seaborn", "joblib")
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(?P<self>\d+) \|\s+(?P<cumulative>\d+) \|(?P<indent>\s+)(?P<module>\S+)$")
+
+_PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+import {target}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+
+def profile_imports(target="smart_city.urls"):
+    """
+    Import a module in a fresh interpreter under -X importtime
+
+    Args:
+        target (str): Module to import after django.setup()
+
+    Returns:
+        dict: seconds (setup + import wall time), rss_mb (peak RSS),
+            modules (list of (module, self_us, cumulative_us), sorted by
+            cumulative time) and heavy (HEAVY_MODULES that were imported)
+    """
+    env = dict(os.environ)
+    env.setdefault("DJANGO_SETTINGS_MODULE", "smart_city.settings")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(target=target)],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            modules.append((match["module"], int(match["self"]), int(match["cumulative"])))
+    modules.sort(key=lambda m: m[2], reverse=True)
+
+    names = {module for module, _, _ in modules}
+    return {
+        "seconds": probe["seconds"],
+        # ru_maxrss is in kilobytes on Linux
+        "rss_mb": probe["rss_kb"] / 1024,
+        "modules": modules,
+        "heavy": sorted(name for name in HEAVY_MODULES if name in names),
+    }
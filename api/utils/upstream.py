@@ -0,0 +1,262 @@
+"""
+Calls to upstream APIs (OpenWeatherMap, Météo France)
+
+Every call first goes through the circuit breaker of its API
+(api.services.circuit_breaker), failing fast while the API is down or too
+slow, then takes one token from the budget of its API key
+(api.services.upstream_budget). Both are shared by the web and scheduler
+processes.
+
+Proxied responses are shared by every web worker through the Django cache:
+each endpoint has its own TTL, an expired entry is still served while one
+worker refreshes it in the background, and a lock taken with cache.add
+ensures only one request per key goes upstream.
+"""
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from api.services import circuit_breaker
+from api.services.circuit_breaker import CircuitOpen
+from api.services.upstream_budget import (
+    INGESTION,
+    PROXY,
+    BudgetExceeded,
+    acquire,
+    acquire_async,
+    try_acquire,
+)
+
+OWM = "owm"
+METEOFRANCE = "meteofrance"
+
+# Raised instead of calling upstream; both carry a retry_after in seconds
+UNAVAILABLE_ERRORS = (BudgetExceeded, CircuitOpen)
+
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="upstream-hedge")
+
+
+def _hedged_get(api, url, api_key, priority, hedge_after, kwargs):
+    """
+    Send a second identical request if the first one is slower than hedge_after
+
+    The hedge only goes out when the budget has a token to spare right away;
+    the first successful answer wins.
+    """
+    futures = [_hedge_pool.submit(requests.get, url, **kwargs)]
+    done, _ = wait(futures, timeout=hedge_after)
+    if not done and not try_acquire(api, api_key, priority):
+        futures.append(_hedge_pool.submit(requests.get, url, **kwargs))
+
+    error = None
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                return future.result()
+            except requests.RequestException as e:
+                error = e
+    raise error
+
+
+def get(api, url, api_key, priority=PROXY, hedge_after=None, latency_slo=None, **kwargs):
+    """
+    GET an upstream URL through its circuit breaker and rate limit budget
+
+    Args:
+        api (str): Upstream API, key of UPSTREAM_RATE_LIMITS
+        url (str): Upstream URL
+        api_key (str): API key sent with the call
+        priority (str): INGESTION for scheduled jobs, PROXY for API requests
+        hedge_after (float): Send a hedged request after this many seconds,
+            None to disable
+        latency_slo (float): Latency SLO of the call in seconds, defaults to
+            the API's UPSTREAM_LATENCY_SLO_SECONDS
+        **kwargs: Passed to requests.get
+
+    Returns:
+        requests.Response: Upstream response, whatever its status
+
+    Raises:
+        CircuitOpen: When the API is considered down
+        BudgetExceeded: When the budget does not allow the call in time
+    """
+    probe = circuit_breaker.allow(api)
+    try:
+        acquire(api, api_key, priority)
+    except BudgetExceeded:
+        circuit_breaker.release(api, probe)
+        raise
+
+    start = time.monotonic()
+    try:
+        if hedge_after is None:
+            response = requests.get(url, **kwargs)
+        else:
+            response = _hedged_get(api, url, api_key, priority, hedge_after, kwargs)
+    except requests.RequestException:
+        circuit_breaker.record(api, False, probe)
+        raise
+    ok = not circuit_breaker.is_failure(
+        api, response.status_code, time.monotonic() - start, latency_slo
+    )
+    circuit_breaker.record(api, ok, probe)
+    return response
+
+
+async def get_async(client, api, url, api_key, priority=INGESTION, latency_slo=None, **kwargs):
+    """
+    Same as get with an httpx.AsyncClient, waiting on the event loop
+    """
+    probe = await sync_to_async(circuit_breaker.allow)(api)
+    try:
+        await acquire_async(api, api_key, priority)
+    except BudgetExceeded:
+        await sync_to_async(circuit_breaker.release)(api, probe)
+        raise
+
+    record = sync_to_async(circuit_breaker.record)
+    try:
+        response = await client.get(url, **kwargs)
+    except httpx.HTTPError:
+        await record(api, False, probe)
+        raise
+    ok = not circuit_breaker.is_failure(
+        api, response.status_code, response.elapsed.total_seconds(), latency_slo
+    )
+    await record(api, ok, probe)
+    return response
+
+
+def fetch_json(api, url, api_key, params=None, headers=None, timeout=10, priority=PROXY, hedge_after=None):
+    """
+    GET an upstream URL and decode its JSON body
+
+    Raises:
+        requests.RequestException: On network errors and HTTP error statuses
+        CircuitOpen: When the API is considered down
+        BudgetExceeded: When the budget does not allow the call in time
+    """
+    response = get(
+        api, url, api_key, priority, hedge_after, params=params, headers=headers, timeout=timeout
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def cache_key(endpoint, key_params):
+    digest = hashlib.sha1(json.dumps(key_params or {}, sort_keys=True).encode()).hexdigest()
+    return f"upstream:{endpoint}:{digest}"
+
+
+def endpoint_ttl(endpoint):
+    return settings.UPSTREAM_CACHE_TTLS.get(endpoint, settings.UPSTREAM_CACHE_DEFAULT_TTL)
+
+
+def _store(key, endpoint, data):
+    cache.set(
+        key,
+        {"data": data, "fetched_at": time.time()},
+        endpoint_ttl(endpoint) + settings.UPSTREAM_CACHE_STALE_SECONDS,
+    )
+    return data
+
+
+def _refresh(key, endpoint, fetch):
+    """
+    Call upstream and store the response, the caller holding the lock
+    """
+    try:
+        return _store(key, endpoint, fetch())
+    finally:
+        cache.delete(f"{key}:lock")
+
+
+def _refresh_in_background(key, endpoint, fetch):
+    def run():
+        try:
+            _refresh(key, endpoint, fetch)
+        except Exception as e:
+            # The stale entry keeps being served, the next request retries
+            print(f"Background refresh of {endpoint} failed: {e}")
+        finally:
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def cached_fetch(endpoint, key_params, fetch):
+    """
+    Fetch an upstream response through the shared cache
+
+    Args:
+        endpoint (str): Name of the endpoint, key of UPSTREAM_CACHE_TTLS
+        key_params (dict): Parameters identifying the response (no secrets)
+        fetch (callable): Calls upstream and returns a JSON-serializable result
+
+    Returns:
+        tuple: (data, age in seconds of the returned data)
+    """
+    key = cache_key(endpoint, key_params)
+    lock_key = f"{key}:lock"
+
+    entry = cache.get(key)
+    if entry is not None:
+        age = time.time() - entry["fetched_at"]
+        # Stale entries are served while a single worker refreshes them
+        if age >= endpoint_ttl(endpoint) and cache.add(lock_key, 1, settings.UPSTREAM_CACHE_LOCK_SECONDS):
+            _refresh_in_background(key, endpoint, fetch)
+        return entry["data"], age
+
+    # Nothing cached: one request goes upstream, the others wait for it
+    deadline = time.monotonic() + settings.UPSTREAM_CACHE_LOCK_SECONDS
+    while not cache.add(lock_key, 1, settings.UPSTREAM_CACHE_LOCK_SECONDS):
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["data"], time.time() - entry["fetched_at"]
+        if time.monotonic() > deadline:
+            # The lock holder is stuck: fetch without the lock
+            return _store(key, endpoint, fetch()), 0.0
+    return _refresh(key, endpoint, fetch), 0.0
+
+
+def cached_get(api, endpoint, url, api_key, params, key_params=None, timeout=10):
+    """
+    GET an upstream JSON endpoint through the shared cache
+
+    Only cache misses and refreshes spend the budget of the API key. While
+    the API's circuit breaker is open, cached responses keep being served
+    until they expire and misses fail fast. Endpoints listed in
+    UPSTREAM_HEDGE_AFTER_SECONDS are fetched with hedged requests.
+
+    Args:
+        api (str): Upstream API, key of UPSTREAM_RATE_LIMITS
+        endpoint (str): Name of the endpoint, key of UPSTREAM_CACHE_TTLS
+        url (str): Upstream URL
+        api_key (str): API key sent with the call
+        params (dict): Query parameters, API keys included
+        key_params (dict): Parameters identifying the response, defaults to params
+        timeout (float): Upstream timeout in seconds
+
+    Returns:
+        tuple: (data, age in seconds of the returned data)
+    """
+    return cached_fetch(
+        endpoint,
+        params if key_params is None else key_params,
+        lambda: fetch_json(
+            api, url, api_key, params, timeout=timeout,
+            hedge_after=settings.UPSTREAM_HEDGE_AFTER_SECONDS.get(endpoint),
+        ),
+    )
@@ -8,6 +8,7 @@ from rest_framework import status
 
 from api.models import AirQualityMeasurement
 from api.utils.aq_utils import get_last_10h_aq
+from api.utils.upstream import UNAVAILABLE_ERRORS
 
 class Last10HoursAQView(APIView):
     @swagger_auto_schema(
@@ -17,6 +18,12 @@ class Last10HoursAQView(APIView):
         try:
             data = get_last_10h_aq()
             return Response(data, status=status.HTTP_200_OK)
+        except UNAVAILABLE_ERRORS as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(int(e.retry_after) + 1)},
+            )
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -1,25 +1,29 @@
+from django.conf import settings
+from django.db import transaction
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from api.models import AlertThreshold, RefIndicator
 from api.serializers import AlertThresholdSerializer
+from api.services.alert_service import close_threshold_episodes
+from api.services.threshold_backtest import backtest as run_backtest, validate_candidates
+from api.services.threshold_cache import get_snapshot, invalidate
 
 # AlertThreshold CRUD
 class AlertThresholdView(viewsets.ViewSet):
     @swagger_auto_schema(tags=['Alerte Threshold'])
     def list(self, request):
-        qs = AlertThreshold.objects.filter(active=True)
-        serializer = AlertThresholdSerializer(qs, many=True)
-        return Response(serializer.data)
+        return Response(get_snapshot().rows)
 
     @swagger_auto_schema(tags=['Alerte Threshold'])
     def retrieve(self, request, pk=None):
         try:
-            obj = AlertThreshold.objects.get(pk=pk, active=True)
-        except AlertThreshold.DoesNotExist:
+            data = get_snapshot().by_id[int(pk)]
+        except (KeyError, TypeError, ValueError):
             return Response(status=status.HTTP_404_NOT_FOUND)
-        serializer = AlertThresholdSerializer(obj)
-        return Response(serializer.data)
+        return Response(data)
 
     @swagger_auto_schema(
         tags=['Alerte Threshold'],
@@ -30,14 +34,18 @@ class AlertThresholdView(viewsets.ViewSet):
         threshold_value = request.data.get("threshold_value")
         if not indicator_code or threshold_value is None:
             return Response({"detail": "indicator and threshold_value required"}, status=400)
-        # Inactive previous active threshold for this indicator
-        AlertThreshold.objects.filter(indicator__code=indicator_code, active=True).update(active=False)
         indicator = RefIndicator.objects.get(code=indicator_code)
-        threshold = AlertThreshold.objects.create(
-            indicator=indicator,
-            threshold_value=threshold_value,
-            active=True
-        )
+        with transaction.atomic():
+            # Inactive previous active threshold for this indicator
+            previous = AlertThreshold.objects.filter(indicator=indicator, active=True)
+            close_threshold_episodes(list(previous.values_list("id", flat=True)))
+            previous.update(active=False)
+            threshold = AlertThreshold.objects.create(
+                indicator=indicator,
+                threshold_value=threshold_value,
+                active=True
+            )
+            invalidate()
         serializer = AlertThresholdSerializer(threshold)
         return Response(serializer.data, status=201)
 
@@ -47,6 +55,47 @@ class AlertThresholdView(viewsets.ViewSet):
             threshold = AlertThreshold.objects.get(pk=pk)
         except AlertThreshold.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        threshold.active = False
-        threshold.save()
+        with transaction.atomic():
+            threshold.active = False
+            threshold.save()
+            close_threshold_episodes([threshold.id])
+            invalidate()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @swagger_auto_schema(
+        tags=['Alerte Threshold'],
+        operation_description="Rejoue des seuils candidats sur l'historique des mesures (sans les enregistrer)",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=["candidates"],
+            properties={
+                "candidates": openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    description='Seuils candidats par indicateur, ex: {"pm10": [20, 35, 50]}',
+                ),
+                "days": openapi.Schema(type=openapi.TYPE_INTEGER, default=90),
+                "latitude": openapi.Schema(type=openapi.TYPE_NUMBER, default=45.75),
+                "longitude": openapi.Schema(type=openapi.TYPE_NUMBER, default=4.85),
+                "timeline": openapi.Schema(type=openapi.TYPE_BOOLEAN, default=True),
+            },
+        ),
+    )
+    @action(detail=False, methods=["post"])
+    def backtest(self, request):
+        candidates = request.data.get("candidates")
+        error = validate_candidates(candidates)
+        if error:
+            return Response({"detail": error}, status=400)
+        try:
+            days = int(request.data.get("days", 90))
+            latitude = float(request.data.get("latitude", 45.75))
+            longitude = float(request.data.get("longitude", 4.85))
+        except (TypeError, ValueError):
+            return Response({"detail": "days, latitude and longitude must be numbers"}, status=400)
+        if not 1 <= days <= settings.BACKTEST_MAX_DAYS:
+            return Response({"detail": f"days must be between 1 and {settings.BACKTEST_MAX_DAYS}"}, status=400)
+        result = run_backtest(
+            candidates, days, latitude, longitude,
+            timeline=bool(request.data.get("timeline", True)),
+        )
+        return Response(result)
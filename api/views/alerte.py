@@ -1,13 +1,78 @@
+from django.utils.dateparse import parse_datetime
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import viewsets
-from api.models import Alerte
-from api.serializers import AlerteSerializer
+from rest_framework.exceptions import ValidationError
+from api.models import Alerte, AlerteArchive
+from api.pagination import AlerteCursorPagination
+from api.serializers import AlerteSerializer, AlerteListSerializer, AlerteArchiveListSerializer
+
+LIST_FILTERS = [
+    openapi.Parameter("archive", openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN, description="Lister les alertes archivées"),
+    openapi.Parameter("alert_type", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="info, warning ou critical"),
+    openapi.Parameter("triggered_by", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="auto ou admin"),
+    openapi.Parameter("status", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="open ou closed"),
+    openapi.Parameter("threshold", openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Id du seuil"),
+    openapi.Parameter("indicator", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Code de l'indicateur (ex: pm10)"),
+    openapi.Parameter("created_after", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Date ISO 8601 (incluse)"),
+    openapi.Parameter("created_before", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Date ISO 8601 (exclue)"),
+]
+
+
+def _parse_datetime_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValidationError({name: "Invalid ISO 8601 datetime"})
+    return parsed
+
 
 class AlerteView(viewsets.ModelViewSet):
-    queryset = Alerte.objects.all()
+    queryset = Alerte.objects.select_related("threshold")
     serializer_class = AlerteSerializer
+    pagination_class = AlerteCursorPagination
 
-    @swagger_auto_schema(tags=['Alerte'])
+    def use_archive(self):
+        return (
+            self.action == "list"
+            and self.request.query_params.get("archive", "").lower() in ("1", "true", "yes")
+        )
+
+    def get_serializer_class(self):
+        if self.use_archive():
+            return AlerteArchiveListSerializer
+        if self.action == "list":
+            return AlerteListSerializer
+        return AlerteSerializer
+
+    def get_queryset(self):
+        if self.use_archive():
+            qs = AlerteArchive.objects.select_related("threshold")
+        else:
+            qs = super().get_queryset()
+        if self.action != "list":
+            return qs
+        params = self.request.query_params
+        for name in ("alert_type", "triggered_by", "status"):
+            if params.get(name):
+                qs = qs.filter(**{name: params[name]})
+        if params.get("threshold"):
+            if not params["threshold"].isdigit():
+                raise ValidationError({"threshold": "Must be an integer"})
+            qs = qs.filter(threshold_id=params["threshold"])
+        if params.get("indicator"):
+            qs = qs.filter(threshold__indicator_id=params["indicator"])
+        created_after = _parse_datetime_param(params, "created_after")
+        if created_after:
+            qs = qs.filter(created_at__gte=created_after)
+        created_before = _parse_datetime_param(params, "created_before")
+        if created_before:
+            qs = qs.filter(created_at__lt=created_before)
+        return qs
+
+    @swagger_auto_schema(tags=['Alerte'], manual_parameters=LIST_FILTERS)
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
@@ -1,17 +1,35 @@
+from functools import lru_cache
+
 from drf_yasg.utils import swagger_auto_schema
 
-import torch
 import numpy as np
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from api.models_ai.air_quality.air_quality_lstm_model import AirQualityLSTM
-from api.models_ai.air_quality.air_quality_scaler import scaler
 from api.utils.aq_utils import get_aq_matrix_10h
+from api.utils.upstream import UNAVAILABLE_ERRORS
+
+
+@lru_cache(maxsize=1)
+def load_predictor():
+    """
+    Load the air quality LSTM and its scaler on first use
+
+    torch and scikit-learn are only imported here, so web workers and
+    management commands that never predict air quality do not pay for them.
+
+    Returns:
+        tuple: (torch module, AirQualityLSTM, MinMaxScaler)
+    """
+    import torch
+    from api.models_ai.air_quality.air_quality_lstm_model import AirQualityLSTM
+    from api.models_ai.air_quality.air_quality_scaler import scaler
+
+    model = AirQualityLSTM(input_size=9, output_size=5, lstm_size=128, n_lstm_layers=2, dense_layers=[32, 16], dropout_rate=0.0)
+    model.load_state_dict(torch.load("api/models_ai/air_quality/air_quality_epoch-750.pt", map_location=torch.device('cpu')))
+    model.eval()
+    return torch, model, scaler
 
-model = AirQualityLSTM(input_size=9, output_size=5, lstm_size=128, n_lstm_layers=2, dense_layers=[32, 16], dropout_rate=0.0)
-model.load_state_dict(torch.load("api/models_ai/air_quality/air_quality_epoch-750.pt", map_location=torch.device('cpu')))
-model.eval()
 
 class AirQualityPredictView(APIView):
 
@@ -20,6 +38,7 @@ class AirQualityPredictView(APIView):
     )
     def get(self, request):
         try:
+            torch, model, scaler = load_predictor()
 
             data = get_aq_matrix_10h()
             data = np.expand_dims(data, axis=0)
@@ -43,5 +62,11 @@ class AirQualityPredictView(APIView):
                 "aq_probabilities": probas
             }, status=status.HTTP_200_OK)
 
+        except UNAVAILABLE_ERRORS as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(int(e.retry_after) + 1)},
+            )
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from api.services.event_broker import broker
+
+EVENT_KINDS = {"alerte", "measurement"}
+
+
+def _authenticate(request):
+    # EventSource cannot send headers, so the token may come as ?token=
+    auth = JWTAuthentication()
+    try:
+        raw_token = request.GET.get("token")
+        if raw_token:
+            return auth.get_user(auth.get_validated_token(raw_token))
+        result = auth.authenticate(request)
+        return result[0] if result else None
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+
+async def _event_stream(kinds):
+    queue = broker.subscribe(kinds)
+    try:
+        yield f"retry: {settings.SSE_RETRY_MS}\n\n"
+        while True:
+            try:
+                kind, payload = await asyncio.wait_for(
+                    queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield (
+                f"id: {kind}-{payload['id']}\n"
+                f"event: {kind}\n"
+                f"data: {json.dumps(payload, default=str)}\n\n"
+            )
+    finally:
+        broker.unsubscribe(queue)
+
+
+async def alert_stream(request):
+    """
+    Server-Sent Events stream of new and updated alerts
+
+    Query parameters:
+        token: JWT access token, when no Authorization header can be sent
+        measurements: "true" to also receive newly ingested measurements
+
+    Must be served through the ASGI application (smart_city.asgi): a WSGI
+    server would read the endless stream before sending anything.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "The event stream requires the ASGI server (smart_city.asgi)."},
+            status=501,
+        )
+    user = await sync_to_async(_authenticate)(request)
+    if user is None or not user.is_active:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided or are invalid."},
+            status=401,
+        )
+    kinds = {"alerte"}
+    if request.GET.get("measurements", "").lower() in ("1", "true", "yes"):
+        kinds.add("measurement")
+    response = StreamingHttpResponse(
+        _event_stream(kinds), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
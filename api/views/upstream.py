@@ -0,0 +1,33 @@
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api.services.circuit_breaker import breaker_status
+from api.services.upstream_budget import budget_status
+
+
+class UpstreamBudgetView(APIView):
+    """
+    Remaining rate limit budget of the upstream APIs
+    """
+
+    @swagger_auto_schema(
+        operation_description="Calls left in the token bucket of each OpenWeatherMap and Météo France API key",
+        tags=['Upstream'],
+    )
+    def get(self, request):
+        return Response(budget_status(), status=status.HTTP_200_OK)
+
+
+class UpstreamBreakerView(APIView):
+    """
+    Circuit breaker state of the upstream APIs
+    """
+
+    @swagger_auto_schema(
+        operation_description="State (closed, open or half_open) and consecutive failures of each upstream API",
+        tags=['Upstream'],
+    )
+    def get(self, request):
+        return Response(breaker_status(), status=status.HTTP_200_OK)
@@ -1,6 +1,7 @@
 import os
 import requests
 
+from api.utils.upstream import OWM, UNAVAILABLE_ERRORS, cached_get
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.response import Response
 from rest_framework import status
@@ -21,10 +22,17 @@ class CurrentWeatherView(APIView):
                 "appid": api_key,
                 "units": "metric"
             }
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            return Response(data, status=status.HTTP_200_OK)
+            data, age = cached_get(
+                OWM, "owm_weather", url, api_key, params,
+                key_params={"lat": params["lat"], "lon": params["lon"], "units": params["units"]},
+            )
+            return Response(data, status=status.HTTP_200_OK, headers={"Age": str(int(age))})
+        except UNAVAILABLE_ERRORS as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(int(e.retry_after) + 1)},
+            )
         except requests.RequestException as e:
             return Response(
                 {"error": str(e)},
@@ -1,11 +1,18 @@
-import os
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from api.services.weather_service import WeatherPredictionService
+from rest_framework.reverse import reverse
+from api.models import TrainingJob
+from api.serializers import TrainingJobSerializer
+from api.services.forecasts import forecast_grid, get_forecast
+from api.services.weather_service import (
+    WEATHER_FEATURES,
+    MAX_DAYS_AHEAD,
+    parse_horizons,
+)
 
 
 class WeatherPredictionView(APIView):
@@ -16,7 +23,7 @@ class WeatherPredictionView(APIView):
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
-        operation_description="Predict weather for next days using machine learning model",
+        operation_description="Weather forecast for next days, precomputed daily by the scheduler with the machine learning models",
         manual_parameters=[
             openapi.Parameter(
                 "feature",
@@ -49,6 +56,7 @@ class WeatherPredictionView(APIView):
                         "context": {
                             "latest_data": {"TX": 20.3, "TN": 12.1, "RR": 0.0},
                             "station_id": "69123002",
+                            "computed_at": "2025-07-07T06:00:12Z",
                             "model_info": {
                                 "target_feature": "TX",
                                 "days_to_predict": 1,
@@ -57,12 +65,27 @@ class WeatherPredictionView(APIView):
                     }
                 },
             ),
-            400: openapi.Response(
-                description="Bad request or prediction failed",
+            202: openapi.Response(
+                description="Model not trained yet, a training job was queued",
                 examples={
                     "application/json": {
                         "success": False,
-                        "error": "Failed to fetch recent weather data",
+                        "error": "Model not trained yet, a training job is in progress",
+                        "job_id": 12,
+                        "job_status": "queued",
+                        "status_url": "http://localhost:3000/api/predict/weather/jobs/12/",
+                        "prediction": None,
+                        "context": None,
+                    }
+                },
+            ),
+            400: "Invalid parameters",
+            503: openapi.Response(
+                description="Model trained but forecast not computed yet",
+                examples={
+                    "application/json": {
+                        "success": False,
+                        "error": "Forecast not computed yet, forecasts are refreshed daily by the scheduler",
                         "prediction": None,
                         "context": None,
                     }
@@ -81,7 +104,7 @@ class WeatherPredictionView(APIView):
             days = int(request.query_params.get("days", 1))
 
             # Validate parameters
-            valid_features = ["TX", "TN", "RR", "TM", "TAMPLI"]
+            valid_features = WEATHER_FEATURES
             if feature not in valid_features:
                 return Response(
                     {
@@ -104,29 +127,18 @@ class WeatherPredictionView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # Get API key from environment
-            api_key = os.environ.get("METEOFRANCE_API_KEY")
-            if not api_key:
-                return Response(
-                    {
-                        "success": False,
-                        "error": "Météo France API key not configured",
-                        "prediction": None,
-                        "context": None,
-                    },
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-
-            # Create prediction service
-            weather_service = WeatherPredictionService(api_key)
-
-            # Make prediction
-            result = weather_service.predict_weather(feature, days)
+            # Read the forecast precomputed by the scheduler
+            result = get_forecast(feature, days)
 
             if result["success"]:
                 return Response(result, status=status.HTTP_200_OK)
+            elif result.get("job_id"):
+                result["status_url"] = reverse(
+                    "training_job", kwargs={"pk": result["job_id"]}, request=request
+                )
+                return Response(result, status=status.HTTP_202_ACCEPTED)
             else:
-                return Response(result, status=status.HTTP_400_BAD_REQUEST)
+                return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
         except ValueError as e:
             return Response(
@@ -148,3 +160,94 @@ class WeatherPredictionView(APIView):
                 },
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class WeatherGridPredictionView(APIView):
+    """
+    Batched weather prediction: several features over several horizons
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Forecasts of several weather features for several days ahead in one call, precomputed daily by the scheduler",
+        manual_parameters=[
+            openapi.Parameter(
+                "features",
+                openapi.IN_QUERY,
+                description="Comma-separated features among TX, TN, RR, TM, TAMPLI (default: all)",
+                type=openapi.TYPE_STRING,
+                default="TX,TN,RR,TM,TAMPLI",
+            ),
+            openapi.Parameter(
+                "days",
+                openapi.IN_QUERY,
+                description="Days ahead, as a range or a list: 1-7, 1,3,5 (default: 1-7)",
+                type=openapi.TYPE_STRING,
+                default="1-7",
+            ),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Prediction grid (feature x days ahead)",
+                examples={
+                    "application/json": {
+                        "success": True,
+                        "grid": {
+                            "TX": {
+                                "1": {"value": 22.5, "prediction_date": "2025-07-09"},
+                                "2": {"value": None, "job_id": 12, "job_status": "queued", "prediction_date": "2025-07-10"},
+                            }
+                        },
+                        "units": {"TX": "°C"},
+                        "pending_jobs": [12],
+                        "context": {
+                            "latest_data": {"TX": 20.3},
+                            "station_id": "69123002",
+                            "computed_at": "2025-07-07T06:00:12Z",
+                        },
+                    }
+                },
+            ),
+            400: "Invalid parameters",
+        },
+        tags=["Weather Prediction"],
+    )
+    def get(self, request):
+        try:
+            features = [
+                f.strip()
+                for f in request.query_params.get("features", ",".join(WEATHER_FEATURES)).split(",")
+                if f.strip()
+            ]
+            invalid = [f for f in features if f not in WEATHER_FEATURES]
+            if invalid or not features:
+                raise ValueError(f"Invalid feature. Must be among: {WEATHER_FEATURES}")
+            horizons = parse_horizons(request.query_params.get("days", f"1-{MAX_DAYS_AHEAD}"))
+        except ValueError as e:
+            return Response(
+                {"success": False, "error": f"Invalid parameters: {str(e)}", "grid": None, "context": None},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(forecast_grid(features, horizons), status=status.HTTP_200_OK)
+
+
+class TrainingJobView(APIView):
+    """
+    Status of a background weather model training job
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Get the status of a weather model training job",
+        responses={200: TrainingJobSerializer, 404: "Job not found"},
+        tags=["Weather Prediction"],
+    )
+    def get(self, request, pk):
+        try:
+            job = TrainingJob.objects.get(pk=pk)
+        except TrainingJob.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(TrainingJobSerializer(job).data, status=status.HTTP_200_OK)
@@ -14,3 +14,18 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_city.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.DEBUG:
+    # Serve static files (Swagger UI) like runserver does in development
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+    application = ASGIStaticFilesHandler(application)
+
+# Warm the weather model registry once per worker
+
+if settings.WEATHER_MODEL_PRELOAD:
+    from api.models_ai.weather.registry import weather_model_registry
+
+    weather_model_registry.preload()
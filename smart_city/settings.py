@@ -119,11 +119,142 @@ SWAGGER_SETTINGS = {
 }
 
 WSGI_APPLICATION = "smart_city.wsgi.application"
+ASGI_APPLICATION = "smart_city.asgi.application"
 
 CRONJOBS = [
     ('0 * * * *', 'django.core.management.call_command', ['check_alerts']),
 ]
 
+# Alerting
+# An alert episode opens when a value reaches its threshold and only closes
+# once the value drops below threshold * (1 - ALERT_HYSTERESIS_RATIO).
+# A new breach within ALERT_COOLDOWN_MINUTES of the episode closing reopens
+# the same episode instead of inserting a new alert.
+ALERT_HYSTERESIS_RATIO = float(os.getenv("ALERT_HYSTERESIS_RATIO", "0.1"))
+ALERT_COOLDOWN_MINUTES = int(os.getenv("ALERT_COOLDOWN_MINUTES", "60"))
+# Closed alerts, and admin alerts whatever their status, that ended more than
+# ALERT_RETENTION_DAYS ago (never less than the cooldown) are moved to
+# alerte_archive, a plain cold table, by the daily archive_alerts job.
+ALERT_RETENTION_DAYS = int(os.getenv("ALERT_RETENTION_DAYS", "90"))
+ALERT_ARCHIVE_BATCH_SIZE = int(os.getenv("ALERT_ARCHIVE_BATCH_SIZE", "1000"))
+# Limits of the what-if threshold backtest (/api/alert-treshold/backtest/)
+BACKTEST_MAX_DAYS = int(os.getenv("BACKTEST_MAX_DAYS", "730"))
+BACKTEST_MAX_CANDIDATES = int(os.getenv("BACKTEST_MAX_CANDIDATES", "200"))
+
+# Server-Sent Events (/api/alerte/stream/)
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_POLL_SECONDS = int(os.getenv("SSE_POLL_SECONDS", "5"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "5000"))
+# While LISTEN is unavailable the feed polls, and retries LISTEN after
+# SSE_LISTEN_RETRY_SECONDS, doubling the delay up to SSE_LISTEN_RETRY_MAX_SECONDS
+SSE_LISTEN_RETRY_SECONDS = int(os.getenv("SSE_LISTEN_RETRY_SECONDS", "5"))
+SSE_LISTEN_RETRY_MAX_SECONDS = int(os.getenv("SSE_LISTEN_RETRY_MAX_SECONDS", "300"))
+
+# Weather
+# Daily Météo France climatology is synced once a day by the scheduler
+# (sync_climatology) into the daily_observation table: only the missing days
+# of the last CLIMATOLOGY_DAYS_BACK days are ordered. Processes keep the
+# slices they read in memory for CLIMATOLOGY_MEMO_SECONDS.
+WEATHER_STATION_ID = os.getenv("WEATHER_STATION_ID", "69123002")
+CLIMATOLOGY_DAYS_BACK = int(os.getenv("CLIMATOLOGY_DAYS_BACK", "365"))
+CLIMATOLOGY_MEMO_SECONDS = int(os.getenv("CLIMATOLOGY_MEMO_SECONDS", "300"))
+# DPClim orders run concurrently (at most DPCLIM_MAX_IN_FLIGHT HTTP requests at
+# once) and are polled with a backoff growing from DPCLIM_POLL_INITIAL_SECONDS
+# to DPCLIM_POLL_MAX_SECONDS; an order is given up after DPCLIM_ORDER_TIMEOUT_SECONDS.
+DPCLIM_MAX_IN_FLIGHT = int(os.getenv("DPCLIM_MAX_IN_FLIGHT", "10"))
+DPCLIM_POLL_INITIAL_SECONDS = float(os.getenv("DPCLIM_POLL_INITIAL_SECONDS", "2"))
+DPCLIM_POLL_MAX_SECONDS = float(os.getenv("DPCLIM_POLL_MAX_SECONDS", "30"))
+DPCLIM_ORDER_TIMEOUT_SECONDS = float(os.getenv("DPCLIM_ORDER_TIMEOUT_SECONDS", "600"))
+
+# Weather models are kept deserialized in memory by the model registry (at
+# most WEATHER_MODEL_CACHE_SIZE of them). Model files are checked for changes
+# every WEATHER_MODEL_STAT_SECONDS. WEATHER_MODEL_PRELOAD loads every saved
+# model when a worker starts.
+WEATHER_MODEL_DIR = os.getenv("WEATHER_MODEL_DIR", os.path.join(BASE_DIR, "api", "models_ai", "weather", "saved_models"))
+WEATHER_MODEL_CACHE_SIZE = int(os.getenv("WEATHER_MODEL_CACHE_SIZE", "64"))
+WEATHER_MODEL_STAT_SECONDS = int(os.getenv("WEATHER_MODEL_STAT_SECONDS", "30"))
+WEATHER_MODEL_PRELOAD = os.getenv("WEATHER_MODEL_PRELOAD", "False") == "True"
+# Missing models are trained by background jobs (run_training_jobs in the
+# scheduler), never inside a request.
+TRAINING_JOB_TIMEOUT_MINUTES = int(os.getenv("TRAINING_JOB_TIMEOUT_MINUTES", "60"))
+# Training jobs only sync the climatology when days are missing, at most
+# once per TRAINING_JOB_SYNC_INTERVAL_SECONDS per station
+TRAINING_JOB_SYNC_INTERVAL_SECONDS = int(os.getenv("TRAINING_JOB_SYNC_INTERVAL_SECONDS", "3600"))
+# Incremental refresh (train_weather_models --incremental): each model gets
+# WEATHER_INCREMENTAL_TREES more trees on the new days, unless its RMSE on
+# those days exceeds its validation RMSE by WEATHER_DRIFT_RATIO or the booster
+# would exceed WEATHER_MAX_TREES trees, which trigger a full retrain.
+WEATHER_INCREMENTAL_TREES = int(os.getenv("WEATHER_INCREMENTAL_TREES", "10"))
+WEATHER_DRIFT_RATIO = float(os.getenv("WEATHER_DRIFT_RATIO", "0.2"))
+WEATHER_MAX_TREES = int(os.getenv("WEATHER_MAX_TREES", "300"))
+
+# Startup budget
+# Time to run django.setup() and import the URLconf, and peak RSS of that
+# process. Checked by `manage.py profile_startup --check` and api.tests; ML
+# libraries (torch, scikit-learn, XGBoost) must load lazily to stay within it.
+STARTUP_IMPORT_BUDGET_SECONDS = float(os.getenv("STARTUP_IMPORT_BUDGET_SECONDS", "3"))
+STARTUP_RSS_BUDGET_MB = int(os.getenv("STARTUP_RSS_BUDGET_MB", "250"))
+
+# Upstream cache
+# OpenWeatherMap responses proxied by the API are shared by every worker
+# through the database cache (`manage.py createcachetable`). Each endpoint
+# is fresh for UPSTREAM_CACHE_TTLS seconds (UPSTREAM_CACHE_DEFAULT_TTL when
+# not listed), then served stale for up to UPSTREAM_CACHE_STALE_SECONDS more
+# while one worker refreshes it. Only one request per key goes upstream at a
+# time; the others wait for it at most UPSTREAM_CACHE_LOCK_SECONDS.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "django_cache",
+    }
+}
+UPSTREAM_CACHE_TTLS = {
+    "owm_weather": int(os.getenv("UPSTREAM_CACHE_OWM_WEATHER_TTL", "300")),
+    "owm_air_history": int(os.getenv("UPSTREAM_CACHE_OWM_AIR_HISTORY_TTL", "600")),
+}
+UPSTREAM_CACHE_DEFAULT_TTL = int(os.getenv("UPSTREAM_CACHE_DEFAULT_TTL", "300"))
+UPSTREAM_CACHE_STALE_SECONDS = int(os.getenv("UPSTREAM_CACHE_STALE_SECONDS", "3600"))
+UPSTREAM_CACHE_LOCK_SECONDS = int(os.getenv("UPSTREAM_CACHE_LOCK_SECONDS", "30"))
+
+# Upstream rate limits
+# Every OpenWeatherMap and Météo France call takes a token from the bucket of
+# its API key (upstream_budget table, shared by web and scheduler), refilled
+# at UPSTREAM_RATE_LIMITS calls per minute and holding one minute of calls.
+# Calls made for an API request leave UPSTREAM_PROXY_RESERVE_RATIO of the
+# bucket to scheduled ingestion and wait at most UPSTREAM_PROXY_MAX_WAIT_SECONDS;
+# ingestion waits up to UPSTREAM_INGESTION_MAX_WAIT_SECONDS.
+UPSTREAM_RATE_LIMITS = {
+    "owm": int(os.getenv("UPSTREAM_OWM_CALLS_PER_MINUTE", "50")),
+    "meteofrance": int(os.getenv("UPSTREAM_METEOFRANCE_CALLS_PER_MINUTE", "45")),
+}
+UPSTREAM_PROXY_RESERVE_RATIO = float(os.getenv("UPSTREAM_PROXY_RESERVE_RATIO", "0.3"))
+UPSTREAM_PROXY_MAX_WAIT_SECONDS = float(os.getenv("UPSTREAM_PROXY_MAX_WAIT_SECONDS", "2"))
+UPSTREAM_INGESTION_MAX_WAIT_SECONDS = float(os.getenv("UPSTREAM_INGESTION_MAX_WAIT_SECONDS", "120"))
+
+# Upstream circuit breakers
+# A call fails when it raises, answers 429 / 5xx or takes longer than
+# UPSTREAM_LATENCY_SLO_SECONDS. UPSTREAM_BREAKER_FAILURES consecutive failures
+# open the breaker of the API (state shared through the cache): calls fail
+# fast, proxied endpoints serve their cached responses, and after
+# UPSTREAM_BREAKER_COOLDOWN_SECONDS a single probe call decides whether it
+# closes. A probe lasting more than UPSTREAM_BREAKER_PROBE_SECONDS is retried.
+UPSTREAM_LATENCY_SLO_SECONDS = {
+    "owm": float(os.getenv("UPSTREAM_OWM_LATENCY_SLO_SECONDS", "2")),
+    "meteofrance": float(os.getenv("UPSTREAM_METEOFRANCE_LATENCY_SLO_SECONDS", "5")),
+}
+# DPClim builds the file of an order while creating or polling it: those calls
+# are slow by design and get their own, longer SLO
+UPSTREAM_DPCLIM_LATENCY_SLO_SECONDS = float(os.getenv("UPSTREAM_DPCLIM_LATENCY_SLO_SECONDS", "20"))
+UPSTREAM_BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_COOLDOWN_SECONDS = int(os.getenv("UPSTREAM_BREAKER_COOLDOWN_SECONDS", "30"))
+UPSTREAM_BREAKER_PROBE_SECONDS = int(os.getenv("UPSTREAM_BREAKER_PROBE_SECONDS", "15"))
+# Proxied endpoints whose call is hedged: a second request is sent when the
+# first has not answered after this many seconds
+UPSTREAM_HEDGE_AFTER_SECONDS = {
+    "owm_weather": float(os.getenv("UPSTREAM_OWM_WEATHER_HEDGE_SECONDS", "0.8")),
+}
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
@@ -181,3 +312,15 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Logging
+# Messages of the api app go to the console, like the rest of the container output
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "api": {"handlers": ["console"], "level": os.getenv("API_LOG_LEVEL", "INFO")},
+    },
+}
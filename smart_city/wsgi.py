@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_city.settings')
 
 application = get_wsgi_application()
+
+# Warm the weather model registry once per worker
+from django.conf import settings  # noqa: E402
+
+if settings.WEATHER_MODEL_PRELOAD:
+    from api.models_ai.weather.registry import weather_model_registry
+
+    weather_model_registry.preload()